@@ -220,11 +220,20 @@ class ReportGeneratorShell(cmd.Cmd):
         session_id = load_session_id()
         headers = {"session_id": session_id} if session_id else {}
 
+        estimate_response = requests.post(f"{API_BASE_URL}/generation_estimate", json=data, headers=headers, verify=False)
+        if estimate_response.status_code == 200:
+            estimate = estimate_response.json()
+            if estimate["decision"] == "queue":
+                print(f"Server is busy: queue position {estimate['queue_position']}, estimated wait {estimate['estimated_wait']} seconds.")
+
         response = requests.post(f"{API_BASE_URL}/generate_report", json=data, headers=headers, verify=False)
         if response.status_code == 200:
             result = response.json()
             save_session_id(result["session_id"])
             print(f"Report generated successfully. Session ID: {result['session_id']}. Total time: {result['total_time']} seconds.")
+        elif response.status_code == 429:
+            detail = response.json()["detail"]
+            print(f"Server is busy (queue position {detail['queue_position']}). Retry after {response.headers.get('Retry-After')} seconds.")
         else:
             print(f"Error: {response.status_code} - {response.text}")
 
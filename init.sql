@@ -11,12 +11,105 @@ CREATE TABLE IF NOT EXISTS users (
 
 -- 創建報告表
 CREATE TABLE IF NOT EXISTS reports (
-    username VARCHAR(255) PRIMARY KEY,
+    id VARCHAR(64) PRIMARY KEY,
+    username VARCHAR(255) NOT NULL,
+    title TEXT,
     final_result JSONB,
     report_config JSONB,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE,
     FOREIGN KEY (username) REFERENCES users(username)
 );
+CREATE INDEX IF NOT EXISTS ix_reports_owner_updated ON reports (username, updated_at, id);
+
+-- 創建報告段落表（每個主要部分一列，可單獨更新或讀取）
+CREATE TABLE IF NOT EXISTS report_sections (
+    report_id VARCHAR(64),
+    section_key VARCHAR(255),
+    position INTEGER NOT NULL,
+    content TEXT,
+    content_hash VARCHAR(64),
+    updated_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (report_id, section_key)
+);
+CREATE INDEX IF NOT EXISTS ix_report_sections_order ON report_sections (report_id, position);
+
+-- 創建報告版本歷史表（只追加；每隔數個版本保存完整快照，其餘只保存變動的主要部分，以 zlib 壓縮）
+CREATE TABLE IF NOT EXISTS report_versions (
+    report_id VARCHAR(64),
+    version INTEGER,
+    is_snapshot BOOLEAN NOT NULL,
+    hashes JSONB,
+    payload BYTEA,
+    created_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (report_id, version)
+);
+
+-- 創建全文檢索表（主要部分與來源文字；tokens 為預先切好的中文 bigram / 英數字詞）
+CREATE TABLE IF NOT EXISTS search_documents (
+    report_id VARCHAR(64),
+    kind VARCHAR(16),
+    ref TEXT,
+    content TEXT,
+    tokens TSVECTOR,
+    PRIMARY KEY (report_id, kind, ref)
+);
+CREATE INDEX IF NOT EXISTS ix_search_documents_tokens ON search_documents USING GIN (tokens);
+
+-- 創建報告結果快取表（以正規化生成要求的雜湊為鍵）
+CREATE TABLE IF NOT EXISTS report_cache (
+    request_hash VARCHAR(64) PRIMARY KEY,
+    source_report_id VARCHAR(64),
+    final_result JSONB,
+    report_config JSONB,
+    artifacts BYTEA,
+    created_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 創建連結摘要表（保存生成報告時各主要部分的連結摘要）
+CREATE TABLE IF NOT EXISTS link_summaries (
+    report_id VARCHAR(64),
+    main_section VARCHAR(255),
+    link VARCHAR,
+    summary TEXT,
+    text_hash VARCHAR(64),
+    prompt_hash VARCHAR(64),
+    PRIMARY KEY (report_id, main_section, link)
+);
+
+-- 創建融合產物表（保存各主要部分融合時的輸入與輸出，輸入以 zlib 壓縮）
+CREATE TABLE IF NOT EXISTS section_artifacts (
+    report_id VARCHAR(64),
+    main_section VARCHAR(255),
+    inputs_hash VARCHAR(64),
+    fusion_inputs BYTEA,
+    output TEXT,
+    input_hashes JSONB,
+    PRIMARY KEY (report_id, main_section)
+);
+
+-- 創建 session 狀態表（多個 worker / 節點共享的產生器狀態，以 zlib 壓縮的 JSON 保存）
+CREATE TABLE IF NOT EXISTS session_states (
+    session_key VARCHAR(255) PRIMARY KEY,
+    version INTEGER NOT NULL,
+    state BYTEA,
+    updated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 創建取消要求表（多個 worker 時，由各 worker 定期查詢並取消對應的工作）
+CREATE TABLE IF NOT EXISTS cancel_requests (
+    scope VARCHAR(255) PRIMARY KEY,
+    requested_at TIMESTAMP WITH TIME ZONE
+);
 
 -- 授予用戶對這些表的權限
 GRANT ALL PRIVILEGES ON TABLE users TO reportuser;
-GRANT ALL PRIVILEGES ON TABLE reports TO reportuser;
\ No newline at end of file
+GRANT ALL PRIVILEGES ON TABLE reports TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE report_sections TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE report_versions TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE search_documents TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE report_cache TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE link_summaries TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE section_artifacts TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE session_states TO reportuser;
+GRANT ALL PRIVILEGES ON TABLE cancel_requests TO reportuser;
\ No newline at end of file
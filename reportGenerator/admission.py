@@ -0,0 +1,141 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional
+
+from cancellation import CancelToken, GenerationCancelled
+from metrics import MetricsRegistry
+
+
+class AdmissionRejected(Exception):
+    """佇列已滿或預估等待過久，請求應以 429 拒絕。"""
+
+    def __init__(self, estimate: Dict[str, Any]):
+        super().__init__("Generation queue is full")
+        self.estimate = estimate
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.estimate["estimated_wait"]))
+
+
+class AdmissionController:
+    """
+    報告生成的准入控制，以預估的 LLM 呼叫數（cost）計算負載。
+
+    - 執行中的 cost 合計不超過 max_active_cost 時直接執行；
+      沒有其他工作執行時，超過上限的單一請求也可以執行
+    - 否則排入最多 max_queue 個請求的 FIFO 佇列，在事件迴圈上等待，不佔用執行緒
+    - 佇列已滿或預估等待超過 max_wait 時拒絕（AdmissionRejected）
+
+    預估等待 = 需要先完成的 cost / throughput()（每秒可完成的 LLM 呼叫數）。
+    只在事件迴圈上使用，不需要加鎖。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        throughput: Callable[[], float],
+        max_active_cost: int = 500,
+        max_queue: int = 20,
+        max_wait: float = 600.0,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        self.name = name
+        self.throughput = throughput
+        self.max_active_cost = max_active_cost
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.active_cost = 0
+        self._queue = deque()
+
+    def estimate(self, cost: int) -> Dict[str, Any]:
+        """預估 cost 大小的新請求會立即執行、排隊或被拒絕，以及排隊位置與等待秒數。"""
+        queued_cost = sum(entry["cost"] for entry in self._queue)
+        if not self._queue and self._fits(cost):
+            return {"decision": "run", "cost": cost, "queue_position": 0, "estimated_wait": 0.0}
+        wait = self._wait_for(queued_cost + cost)
+        position = len(self._queue) + 1
+        decision = "queue" if position <= self.max_queue and wait <= self.max_wait else "reject"
+        return {"decision": decision, "cost": cost, "queue_position": position, "estimated_wait": round(wait, 1)}
+
+    @asynccontextmanager
+    async def admit(self, cost: int, token: Optional[CancelToken] = None):
+        """
+        取得執行資格後 yield 排隊等待的秒數，離開時釋放；等待中被取消（例如用戶端斷線）時離開佇列。
+        排隊中 token 被取消時拋出 GenerationCancelled。
+        """
+        estimate = self.estimate(cost)
+        if estimate["decision"] == "reject":
+            self._count("rejected")
+            raise AdmissionRejected(estimate)
+
+        start_time = time.monotonic()
+        if estimate["decision"] == "run":
+            self.active_cost += cost
+        else:
+            self._count("queued")
+            entry = {"cost": cost, "future": asyncio.get_running_loop().create_future()}
+            self._queue.append(entry)
+            if token is not None:
+                loop = asyncio.get_running_loop()
+                token.add_callback(lambda: loop.call_soon_threadsafe(entry["future"].cancel))
+            try:
+                await entry["future"]
+            except asyncio.CancelledError:
+                if entry["future"].done() and not entry["future"].cancelled():
+                    # 已取得資格才被取消，釋放名額
+                    self._release(cost)
+                else:
+                    if entry in self._queue:
+                        self._queue.remove(entry)
+                    self._wake()
+                if token is not None and token.cancelled:
+                    raise GenerationCancelled(token.reason) from None
+                raise
+        queue_wait = time.monotonic() - start_time
+        self._count("admitted")
+        if self.metrics is not None:
+            self.metrics.latency(f"{self.name}.queue_wait").observe(queue_wait)
+        try:
+            yield queue_wait
+        finally:
+            self._release(cost)
+
+    def stats(self) -> Dict[str, Any]:
+        queued_cost = sum(entry["cost"] for entry in self._queue)
+        return {
+            "active_cost": self.active_cost,
+            "max_active_cost": self.max_active_cost,
+            "queued": len(self._queue),
+            "queued_cost": queued_cost,
+            "throughput": round(self.throughput(), 3),
+            "estimated_wait": round(self._wait_for(queued_cost), 1)
+        }
+
+    def _fits(self, cost: int) -> bool:
+        return self.active_cost == 0 or self.active_cost + cost <= self.max_active_cost
+
+    def _wait_for(self, cost: int) -> float:
+        """執行中與排在前面的工作須先完成多少 cost，才能再放入 cost 的工作。"""
+        backlog = max(0, self.active_cost + cost - self.max_active_cost)
+        return backlog / max(self.throughput(), 1e-6)
+
+    def _release(self, cost: int):
+        self.active_cost -= cost
+        self._wake()
+
+    def _wake(self):
+        while self._queue and self._fits(self._queue[0]["cost"]):
+            entry = self._queue.popleft()
+            if entry["future"].done():
+                continue
+            self.active_cost += entry["cost"]
+            entry["future"].set_result(True)
+
+    def _count(self, event: str):
+        if self.metrics is not None:
+            self.metrics.increment(f"{self.name}.{event}")
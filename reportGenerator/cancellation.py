@@ -0,0 +1,110 @@
+import concurrent.futures
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+
+class GenerationCancelled(BaseException):
+    """
+    報告工作已被取消。
+    繼承 BaseException，讓爬取與摘要中捕捉 Exception 的錯誤處理不會吞掉取消，
+    一路傳回發起工作的端點。
+    """
+
+
+class CancelToken:
+    """跨執行緒共用的取消標記；工作在檢查點呼叫 raise_if_cancelled。"""
+
+    def __init__(self):
+        self.created_at = time.time()
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """取消時呼叫 callback；已經取消時立即呼叫。"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def child(self) -> "CancelToken":
+        """建立子標記：本標記取消時子標記一併取消，子標記單獨取消則不影響本標記。"""
+        token = CancelToken()
+        self.add_callback(lambda: token.cancel(self.reason))
+        return token
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """等待最多 timeout 秒，期間被取消時提早回傳 True。"""
+        return self._event.wait(timeout)
+
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("current_cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: Optional[CancelToken]):
+    """讓目前 context 中的工作（以及經由 work_pool 提交的工作）使用 token。"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+def check_cancelled():
+    """檢查點：目前的工作已被取消時拋出 GenerationCancelled。"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def sleep(seconds: float):
+    """可被取消的 time.sleep。"""
+    token = _current_token.get()
+    if token is None:
+        threading.Event().wait(seconds)
+    elif token.wait(seconds):
+        token.raise_if_cancelled()
+
+
+def wait_result(future: concurrent.futures.Future):
+    """
+    等待其他工作的結果（例如合併到同一次執行的呼叫），等待期間檢查目前的 token：
+    被取消時立即拋出 GenerationCancelled，不等待該次執行結束。
+    """
+    token = _current_token.get()
+    if token is None:
+        return future.result()
+    wakeup = threading.Event()
+    future.add_done_callback(lambda _: wakeup.set())
+    token.add_callback(wakeup.set)
+    wakeup.wait()
+    token.raise_if_cancelled()
+    return future.result()
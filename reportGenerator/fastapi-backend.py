@@ -6,7 +6,9 @@ from typing import List, Optional, Dict
 import uuid
 import os
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from session_registry import SessionRegistry, estimate_size
 
 # Configure logging
 logging.basicConfig(
@@ -52,19 +54,27 @@ class SessionData(BaseModel):
     created_at: datetime = Field(default_factory=datetime.now)
     last_activity: datetime = Field(default_factory=datetime.now)
 
+def create_session(session_id: str) -> SessionData:
+    logger.info(f"Created new session: {session_id}")
+    return SessionData(session_id=session_id)
+
 # In-memory storage for sessions (in a production environment, use a database)
-sessions = {}
+# Bounded: least recently used sessions are evicted past the entry/size limits,
+# idle sessions after 24 hours.
+sessions = SessionRegistry(
+    create_session,
+    max_entries=int(os.getenv("SESSION_MAX_ENTRIES", "1000")),
+    ttl_seconds=int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600))),
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024))),
+    size_of=lambda session: estimate_size(session.json()),
+    logger=logger
+)
 
 # Clean up old sessions periodically
 def cleanup_old_sessions():
-    cutoff_time = datetime.now() - timedelta(hours=24)  # Sessions older than 24 hours
-    expired_sessions = [s_id for s_id, session in sessions.items() if session.last_activity < cutoff_time]
-
-    for s_id in expired_sessions:
-        del sessions[s_id]
-
-    if expired_sessions:
-        logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
+    expired_count = sessions.evict_expired()
+    if expired_count:
+        logger.info(f"Cleaned up {expired_count} expired sessions")
 
 app = FastAPI(title="Report Generator API")
 
@@ -82,17 +92,10 @@ def get_or_create_session(session_id: Optional[str] = Header(None, convert_under
     if not session_id:
         # Generate a new session ID if not provided
         session_id = str(uuid.uuid4())
-        sessions[session_id] = SessionData(session_id=session_id)
-        logger.info(f"Created new session: {session_id}")
-    elif session_id not in sessions:
-        # Create a new session with the provided ID
-        sessions[session_id] = SessionData(session_id=session_id)
-        logger.info(f"Created new session with provided ID: {session_id}")
-    else:
-        # Update last activity timestamp
-        sessions[session_id].last_activity = datetime.now()
-
-    return sessions[session_id]
+    session = sessions.get(session_id)
+    # Update last activity timestamp
+    session.last_activity = datetime.now()
+    return session
 
 # Agent class to handle responses
 class Agent:
@@ -298,7 +301,7 @@ async def get_sources(session: SessionData = Depends(get_or_create_session)):
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "sessions_count": len(sessions)}
+    return {"status": "healthy", "sessions_count": len(sessions), "sessions": sessions.stats()}
 
 if __name__ == "__main__":
     import uvicorn
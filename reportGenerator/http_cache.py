@@ -0,0 +1,129 @@
+import gzip
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小於此大小的回應壓縮效益不大，直接回傳
+MIN_COMPRESS_BYTES = 1024
+ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化為 UTF-8 JSON；有安裝 orjson 時使用 orjson。"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判斷 If-None-Match 是否包含 etag。
+    壓縮後的回應會在 ETag 後加上編碼後綴，比對時忽略後綴。
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        for suffix in ENCODING_SUFFIXES.values():
+            if candidate.endswith(f'{suffix}"'):
+                candidate = candidate[:-len(suffix) - 1] + '"'
+                break
+        if candidate == etag:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {
+        part.split(";")[0].strip().lower()
+        for part in accept_encoding.split(",")
+        if not part.strip().endswith(";q=0")
+    }
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def encoded_response(
+    request: Request,
+    body: bytes,
+    media_type: str,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    依 If-None-Match 回傳 304，否則依 Accept-Encoding 以 brotli / gzip 壓縮 body。
+    etag 需為帶引號的強 ETag，壓縮後的表示會加上編碼後綴以區分不同位元組內容。
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(request.headers.get("accept-encoding", "")) if len(body) >= MIN_COMPRESS_BYTES else None
+    if etag is not None:
+        headers["ETag"] = etag[:-1] + ENCODING_SUFFIXES[encoding] + '"' if encoding else etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip 格式
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def encoded_stream(
+    request: Request,
+    chunks: Iterable[bytes],
+    media_type: str,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    compress: bool = True
+) -> StreamingResponse:
+    """
+    encoded_response 的串流版本：chunks 逐塊壓縮後輸出。
+    已壓縮的格式（如 docx / pdf）傳入 compress=False。
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(request.headers.get("accept-encoding", "")) if compress else None
+    if etag is not None:
+        headers["ETag"] = etag[:-1] + ENCODING_SUFFIXES[encoding] + '"' if encoding else etag
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        chunks = compress_stream(chunks, encoding)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -0,0 +1,192 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from cancellation import current_token
+from metrics import MetricsRegistry
+from scheduling import RETRY_RANK, WORKLOAD_RANKS, FairQueue, current_work
+
+RETRY_AFTER_PATTERN = re.compile(r"retry (?:after|in) (\d+(?:\.\d+)?)\s*(?:s|sec|second)", re.IGNORECASE)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    判斷例外是否為 429（OpenAI / Azure 的速率限制），包含被其他套件包裝過的例外。
+    只依 HTTP 狀態碼或例外類型（RateLimitError）判斷，不比對錯誤訊息，
+    避免訊息中剛好出現 "429" 等字樣（例如 token 數）時誤判。
+    """
+    for exc in (error, error.__cause__, error.__context__):
+        if exc is None:
+            continue
+        status = getattr(exc, "status_code", None) or getattr(exc, "http_status", None)
+        response = getattr(exc, "response", None)
+        if status is None and response is not None:
+            status = getattr(response, "status_code", None)
+        if status == 429:
+            return True
+        if any(cls.__name__ == "RateLimitError" for cls in type(exc).__mro__):
+            return True
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """取得 Retry-After 標頭（秒數）或錯誤訊息中的建議等待時間，取不到時回傳 None。"""
+    for exc in (error, error.__cause__, error.__context__):
+        if exc is None:
+            continue
+        headers = getattr(exc, "headers", None)
+        response = getattr(exc, "response", None)
+        if headers is None and response is not None:
+            headers = getattr(response, "headers", None)
+        if headers:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+            try:
+                return float(value) if value is not None else None
+            except (TypeError, ValueError):
+                pass
+        match = RETRY_AFTER_PATTERN.search(str(exc))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class ConcurrencyGovernor:
+    """
+    程序內共用的 LLM 並行數控制。
+
+    - 等待中的呼叫在 FairQueue 中排隊取得執行名額，不會因為名額不足而失敗：
+      互動操作優先於報告生成，同類別內依使用者加權公平分配（見 scheduling.current_work）
+    - 以 AIMD 調整名額：成功且延遲低於 latency_target 時加性增加（每輪約 +1），
+      遇到 429 或延遲過高時乘以 backoff；同一波壅塞中失敗的多個呼叫只減少一次，
+      兩次減少至少間隔一個平均延遲
+    - 429 時暫停所有新的呼叫直到 Retry-After（沒有時以指數退避）後重試，最多 max_retries 次
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_target: float = 60.0,
+        expected_latency: float = 10.0,
+        backoff: float = 0.5,
+        max_retries: int = 5,
+        weights: Optional[Dict[str, float]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._condition = threading.Condition()
+        self._waiters = FairQueue(weights)
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._last_decrease = float("-inf")
+        # 成功呼叫延遲的指數移動平均，用於預估吞吐量
+        self._latency = expected_latency
+
+    def call(self, func: Callable[[], Any]):
+        for attempt in range(self.max_retries + 1):
+            self._acquire(retry=attempt > 0)
+            start_time = time.monotonic()
+            try:
+                result = func()
+            except BaseException as e:
+                if not isinstance(e, Exception) or not is_rate_limited(e):
+                    self._release(time.monotonic() - start_time, congested=False, succeeded=False)
+                    raise
+                self._release(time.monotonic() - start_time, congested=True, succeeded=False)
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(60.0, 2.0 ** attempt)
+                self._count("rate_limited")
+                if attempt == self.max_retries:
+                    self.logger.error(f"{self.name}: rate limited, giving up after {attempt + 1} attempts")
+                    raise
+                self.logger.warning(f"{self.name}: rate limited, retrying in {delay:.1f}s (limit={self.limit:.1f})")
+                self._count("retries")
+                self._block(delay)
+                continue
+            latency = time.monotonic() - start_time
+            self._release(latency, congested=latency > self.latency_target, succeeded=True)
+            if self.metrics is not None:
+                self.metrics.latency(f"{self.name}.call").observe(latency)
+            return result
+
+    def throughput(self) -> float:
+        """預估每秒可完成的呼叫數：目前名額 / 平均延遲。"""
+        with self._condition:
+            return self.limit / max(self._latency, 1e-3)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "queued_by_class": self._waiters.counts(),
+                "latency_ewma": round(self._latency, 2),
+                "blocked_for": round(max(0.0, self._blocked_until - time.monotonic()), 2)
+            }
+
+    def _acquire(self, retry: bool = False):
+        ticket = object()
+        username, workload = current_work()
+        token = current_token()
+        start_time = time.monotonic()
+        with self._condition:
+            self._waiters.push(ticket, username, RETRY_RANK if retry else WORKLOAD_RANKS[workload])
+            while True:
+                if token is not None and token.cancelled:
+                    # 排隊中的工作被取消時離開佇列，讓後面的等待者遞補
+                    self._waiters.remove(ticket)
+                    self._condition.notify_all()
+                    token.raise_if_cancelled()
+                wait_for = self._blocked_until - time.monotonic()
+                if self._waiters.peek() is ticket and wait_for <= 0 and self._in_flight < int(self.limit):
+                    break
+                timeout = wait_for if wait_for > 0 else None
+                if token is not None:
+                    # 定期醒來檢查是否已取消
+                    timeout = min(timeout or 1.0, 1.0)
+                self._condition.wait(timeout=timeout)
+            self._waiters.pop()
+            self._in_flight += 1
+            # 名額可能不只一個，讓下一位等待者重新檢查
+            self._condition.notify_all()
+        if self.metrics is not None:
+            self.metrics.latency(f"{self.name}.queue_wait.{workload}").observe(time.monotonic() - start_time)
+
+    def _release(self, latency: float, congested: bool, succeeded: bool):
+        with self._condition:
+            self._in_flight -= 1
+            if congested:
+                now = time.monotonic()
+                if now - self._last_decrease >= self._latency:
+                    self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                    self._last_decrease = now
+            elif succeeded:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            if succeeded:
+                self._latency = 0.8 * self._latency + 0.2 * latency
+            self._condition.notify_all()
+
+    def _block(self, delay: float):
+        with self._condition:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._condition.notify_all()
+
+    def _count(self, event: str):
+        if self.metrics is not None:
+            self.metrics.increment(f"{self.name}.{event}")
@@ -0,0 +1,78 @@
+import threading
+from collections import deque
+from typing import Any, Callable, Dict
+
+
+class LatencyStats:
+    """延遲統計：累計次數、平均、最大值，以及最近 window 筆樣本的 p50 / p99。"""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, maximum = self.count, self.total, self.max
+
+        def percentile(pct):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 2) if count else 0.0,
+            "p50_ms": round(percentile(50) * 1000, 2),
+            "p99_ms": round(percentile(99) * 1000, 2),
+            "max_ms": round(maximum * 1000, 2)
+        }
+
+
+class MetricsRegistry:
+    """程序內的指標集合，透過 /metrics 以 JSON 輸出。"""
+
+    def __init__(self):
+        self._latencies: Dict[str, LatencyStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def latency(self, name: str) -> LatencyStats:
+        with self._lock:
+            if name not in self._latencies:
+                self._latencies[name] = LatencyStats()
+            return self._latencies[name]
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, func: Callable[[], Any]):
+        """登記一個在輸出時才計算的指標。"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = dict(self._latencies)
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        return {
+            "latencies": {name: stats.snapshot() for name, stats in latencies.items()},
+            "counters": counters,
+            "gauges": {name: func() for name, func in gauges.items()}
+        }
+
+
+metrics = MetricsRegistry()
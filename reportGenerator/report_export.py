@@ -0,0 +1,247 @@
+import importlib.util
+import io
+import logging
+import os
+import re
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+EXPORT_FORMATS = {
+    "txt": "text/plain; charset=utf-8",
+    "md": "text/markdown; charset=utf-8",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf"
+}
+# 可逐段輸出的文字格式；docx / pdf 需要完整文件才能產生，交由 worker pool 繪製
+STREAMING_FORMATS = {"txt", "md"}
+CHUNK_SIZE = 64 * 1024
+# docx / pdf 繪製所需的選用套件
+RENDER_MODULES = {"docx": "docx", "pdf": "reportlab"}
+
+
+class ExportUnavailableError(Exception):
+    """繪製該格式所需的套件未安裝。"""
+
+
+def export_available(fmt: str) -> bool:
+    module = RENDER_MODULES.get(fmt)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def render_text_chunks(fmt: str, title: str, sections: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """逐個主要部分產生 txt / md 內容。"""
+    if fmt == "md":
+        yield f"# {title}\n\n".encode("utf-8")
+        for main_section, content in sections:
+            yield f"## {main_section}\n\n{content}\n\n".encode("utf-8")
+    else:
+        yield f"Report for: {title}\n\n".encode("utf-8")
+        for main_section, content in sections:
+            yield f"# {main_section}\n\n{content}\n\n".encode("utf-8")
+
+
+def render_document(fmt: str, title: str, sections: List[Tuple[str, str]]) -> bytes:
+    """繪製 docx / pdf，於 worker process 中執行。"""
+    if fmt == "docx":
+        return render_docx(title, sections)
+    if fmt == "pdf":
+        return render_pdf(title, sections)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def render_docx(title: str, sections: List[Tuple[str, str]]) -> bytes:
+    try:
+        from docx import Document
+    except ImportError as e:
+        raise ExportUnavailableError("python-docx is not installed") from e
+    document = Document()
+    document.add_heading(title, level=0)
+    for main_section, content in sections:
+        document.add_heading(main_section, level=1)
+        for paragraph in content.split("\n"):
+            if paragraph.strip():
+                document.add_paragraph(paragraph.strip())
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def render_pdf(title: str, sections: List[Tuple[str, str]]) -> bytes:
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+    except ImportError as e:
+        raise ExportUnavailableError("reportlab is not installed") from e
+    # 繁體中文使用內建的 CID 字型，不需額外的字型檔
+    pdfmetrics.registerFont(UnicodeCIDFont("MSung-Light"))
+    styles = getSampleStyleSheet()
+    for name in ("Title", "Heading1", "BodyText"):
+        styles[name].fontName = "MSung-Light"
+    styles["BodyText"].wordWrap = "CJK"
+
+    story = [Paragraph(escape(title), styles["Title"])]
+    for main_section, content in sections:
+        story.append(Paragraph(escape(main_section), styles["Heading1"]))
+        for paragraph in content.split("\n"):
+            if paragraph.strip():
+                story.append(Paragraph(escape(paragraph.strip()), styles["BodyText"]))
+                story.append(Spacer(1, 4))
+    output = io.BytesIO()
+    SimpleDocTemplate(output, pagesize=A4, title=title).build(story)
+    return output.getvalue()
+
+
+ARCHIVE_FORMATS = {
+    "zip": "application/zip",
+    "tar": "application/gzip"  # tar.gz
+}
+
+
+def export_filename(title: str, report_id: str, fmt: str) -> str:
+    safe_title = re.sub(r'[\\/:*?"<>|\s]+', "_", title or "report").strip("_")[:80]
+    return f"{safe_title}_{report_id}.{fmt}"
+
+
+class _ChunkSink:
+    """只能寫入的檔案物件，讓 zipfile / tarfile 的輸出可以逐塊取出。"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_archive(entries: Iterable[Tuple[str, Iterable[bytes]]], archive: str) -> Iterator[bytes]:
+    """
+    將 (檔名, 內容 chunks) 逐一寫入 zip 或 tar.gz 並即時輸出。
+    zip 以 chunk 為單位寫入；tar 需要事先知道檔案大小，因此一次只保留一份報告在記憶體中。
+    """
+    sink = _ChunkSink()
+    if archive == "zip":
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name, chunks in entries:
+                info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with zf.open(info, "w", force_zip64=True) as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                data = sink.drain()
+                if data:
+                    yield data
+    else:
+        with tarfile.open(fileobj=sink, mode="w|gz") as tf:
+            for name, chunks in entries:
+                content = b"".join(chunks)
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                info.mtime = int(time.time())
+                tf.addfile(info, io.BytesIO(content))
+                data = sink.drain()
+                if data:
+                    yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def iter_file(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class RenderCache:
+    """
+    已繪製匯出檔的磁碟快取，以報告版本雜湊與格式為鍵。
+    放在磁碟上讓同一台主機的多個 worker 共用；超過 max_bytes 時移除最久未讀取的檔案。
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 0, logger: Optional[logging.Logger] = None):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "report_exports")
+        self.max_bytes = max_bytes
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes):
+        for _ in self.write(key, [data]):
+            pass
+
+    def write(self, key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        一邊輸出 chunks 一邊寫入快取；完整輸出後才以 rename 寫入，
+        中途中斷（例如用戶端斷線）時捨棄暫存檔。
+        """
+        temp_path = self.path(f".{key}.{uuid.uuid4().hex}.tmp")
+        completed = False
+        try:
+            with open(temp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(temp_path, self.path(key))
+            completed = True
+            self.prune()
+        finally:
+            if not completed and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def prune(self):
+        if not self.max_bytes:
+            return
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(self.path(name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.path(name))
+                    total -= size
+                    self.logger.info(f"Evicted export cache entry {name}")
+                except FileNotFoundError:
+                    pass
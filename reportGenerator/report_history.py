@@ -0,0 +1,71 @@
+import difflib
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def decode_payload(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def build_payload(
+    sections: Dict[str, str],
+    hashes: Dict[str, str],
+    previous_hashes: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    建立一個版本的內容。
+    previous_hashes 為 None 時為完整快照，否則只保存與上一版雜湊不同的部分。
+
+    Returns:
+        dict: {"order": [主要部分...], "sections": {主要部分: 內容}}
+    """
+    if previous_hashes is None:
+        changed = dict(sections)
+    else:
+        changed = {key: content for key, content in sections.items() if previous_hashes.get(key) != hashes[key]}
+    return {"order": list(sections), "sections": changed}
+
+
+def rebuild(payloads: List[Dict[str, Any]]) -> Dict[str, str]:
+    """依序套用從完整快照開始的各版本內容，得到最後一版的報告。"""
+    result: Dict[str, str] = {}
+    for payload in payloads:
+        result = {key: payload["sections"].get(key, result.get(key, "")) for key in payload["order"]}
+    return result
+
+
+def section_diff(
+    old: Tuple[Dict[str, str], Dict[str, str]],
+    new: Tuple[Dict[str, str], Dict[str, str]]
+) -> Dict[str, Any]:
+    """
+    比較兩個版本，只對雜湊不同的主要部分產生逐行差異。
+
+    Args:
+        old, new: (各主要部分內容, 各主要部分雜湊)
+
+    Returns:
+        dict: {"added": [...], "removed": [...], "changed": {主要部分: unified diff}}
+    """
+    old_sections, old_hashes = old
+    new_sections, new_hashes = new
+    changed = {}
+    for key in new_sections:
+        if key in old_sections and old_hashes.get(key) != new_hashes.get(key):
+            changed[key] = "\n".join(difflib.unified_diff(
+                old_sections[key].splitlines(),
+                new_sections[key].splitlines(),
+                fromfile=key,
+                tofile=key,
+                lineterm=""
+            ))
+    return {
+        "added": [key for key in new_sections if key not in old_sections],
+        "removed": [key for key in old_sections if key not in new_sections],
+        "changed": changed
+    }
@@ -0,0 +1,111 @@
+import contextvars
+import heapq
+import itertools
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# 工作類別：互動操作（重新處理、推薦主要部分、內容摘要更新）優先於完整的報告生成
+INTERACTIVE = "interactive"
+BATCH = "batch"
+WORKLOAD_RANKS = {INTERACTIVE: 1, BATCH: 2}
+# 重試中的呼叫已經排過隊，排在所有類別之前
+RETRY_RANK = 0
+
+_current_work: contextvars.ContextVar[Tuple[str, str]] = contextvars.ContextVar("current_work", default=("", BATCH))
+
+
+@contextmanager
+def work_context(username: str, workload: str):
+    """標記目前執行緒（context）中的工作屬於哪個使用者與類別，供排程使用。"""
+    token = _current_work.set((username, workload))
+    try:
+        yield
+    finally:
+        _current_work.reset(token)
+
+
+def current_work() -> Tuple[str, str]:
+    """回傳 (使用者, 工作類別)；未標記時為匿名的 batch 工作。"""
+    return _current_work.get()
+
+
+def parse_weights(value: Optional[str]) -> Dict[str, float]:
+    """解析 "alice=2,bob=0.5" 格式的使用者權重，格式錯誤的項目略過。"""
+    weights = {}
+    for item in (value or "").split(","):
+        name, _, weight = item.partition("=")
+        try:
+            weights[name.strip()] = float(weight)
+        except ValueError:
+            continue
+    return {name: weight for name, weight in weights.items() if name and weight > 0}
+
+
+class FairQueue:
+    """
+    等待者的加權公平佇列（start-time fair queuing）。
+
+    - 先依類別排序：重試 > interactive > batch
+    - 同一類別內依使用者的虛擬開始時間排序；每次服務推進 cost / weight，
+      因此提交大量呼叫的使用者不會讓其他使用者排在其後面
+    - 相同開始時間依抵達順序
+
+    本身不加鎖，由呼叫端（ConcurrencyGovernor）在持有鎖時使用。
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, default_weight: float = 1.0):
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self._heap: List[Tuple[int, float, int, Any, str]] = []
+        self._sequence = itertools.count()
+        self._virtual_time: Dict[int, float] = {}
+        self._last_finish: Dict[Tuple[int, str], float] = {}
+        self._queued: Dict[Tuple[int, str], int] = {}
+
+    def push(self, item: Any, username: str, rank: int, cost: float = 1.0):
+        key = (rank, username)
+        start = max(self._virtual_time.get(rank, 0.0), self._last_finish.get(key, 0.0))
+        self._last_finish[key] = start + cost / self.weights.get(username, self.default_weight)
+        self._queued[key] = self._queued.get(key, 0) + 1
+        heapq.heappush(self._heap, (rank, start, next(self._sequence), item, username))
+
+    def remove(self, item: Any):
+        """移除尚未輪到的等待者（例如工作已被取消）。"""
+        for index, entry in enumerate(self._heap):
+            if entry[3] is item:
+                break
+        else:
+            return
+        rank, _, _, _, username = self._heap.pop(index)
+        heapq.heapify(self._heap)
+        key = (rank, username)
+        self._queued[key] -= 1
+        if not self._queued[key]:
+            del self._queued[key]
+            del self._last_finish[key]
+
+    def peek(self) -> Any:
+        return self._heap[0][3]
+
+    def pop(self) -> Any:
+        rank, start, _, item, username = heapq.heappop(self._heap)
+        self._virtual_time[rank] = start
+        key = (rank, username)
+        self._queued[key] -= 1
+        if not self._queued[key]:
+            # 使用者沒有等待中的呼叫時不保留其進度，閒置後重新排隊不會被懲罰
+            del self._queued[key]
+            del self._last_finish[key]
+        return item
+
+    def counts(self) -> Dict[str, int]:
+        names = {rank: name for name, rank in WORKLOAD_RANKS.items()}
+        names[RETRY_RANK] = "retry"
+        counts = {}
+        for rank, *_ in self._heap:
+            name = names.get(rank, str(rank))
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def __len__(self) -> int:
+        return len(self._heap)
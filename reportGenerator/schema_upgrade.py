@@ -0,0 +1,124 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import MetaData, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+# 舊版報告以使用者名稱為主鍵；升級時以固定的命名空間推導報告 id，重複執行得到相同結果
+LEGACY_REPORT_NAMESPACE = uuid.UUID("6f9a3c1e-2d4b-4e8a-9c7f-1b5d0e3a8f42")
+# 多個 worker 同時啟動時只讓一個執行升級（Postgres advisory lock 的鍵）
+UPGRADE_LOCK_KEY = 740523
+
+
+def legacy_report_id(username: str) -> str:
+    return uuid.uuid5(LEGACY_REPORT_NAMESPACE, username).hex
+
+
+def upgrade(engine: Engine, metadata: MetaData, logger: Optional[logging.Logger] = None):
+    """
+    將既有資料庫升級到目前的結構，應在 create_all 之前執行；已是最新結構時不做任何事。
+
+    - reports 以使用者名稱為主鍵的舊表：重建為以 id 為主鍵，每位使用者的報告取得固定的 id，
+      report_sections / report_versions 中以使用者名稱作為 report_id 的資料一併改為新 id
+    - link_summaries / section_artifacts 以 username 為鍵的舊表：重建為以 report_id 為鍵
+    - 舊的 session 狀態（鍵不含報告 id）刪除
+    - 既有的表缺少可為 NULL 的欄位或索引時補上
+    """
+    logger = logger or logging.getLogger(__name__)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": UPGRADE_LOCK_KEY})
+        tables = set(inspect(conn).get_table_names())
+        if "reports" in tables and "id" not in column_names(conn, "reports"):
+            report_ids = rebuild_reports(conn, metadata.tables["reports"], logger)
+            for name in ("report_sections", "report_versions"):
+                if name in tables:
+                    for username, report_id in report_ids.items():
+                        conn.execute(text(f"UPDATE {name} SET report_id = :report_id WHERE report_id = :username"), {"report_id": report_id, "username": username})
+            if "session_states" in tables:
+                conn.execute(text("DELETE FROM session_states WHERE session_key NOT LIKE '%/%'"))
+        for name in ("link_summaries", "section_artifacts"):
+            if name in tables and "report_id" not in column_names(conn, name):
+                rebuild_keyed_by_user(conn, metadata.tables[name], logger)
+        for name, table in metadata.tables.items():
+            if name in tables:
+                add_missing_columns(conn, table, logger)
+                add_missing_indexes(conn, table, logger)
+
+
+def column_names(conn: Connection, table_name: str):
+    return {column["name"] for column in inspect(conn).get_columns(table_name)}
+
+
+def rename_to_legacy(conn: Connection, table_name: str) -> Table:
+    """將舊表改名為 <name>_legacy 並回傳其反射結果；Postgres 的主鍵約束名稱一併改名，新表才能使用原名。"""
+    legacy_name = f"{table_name}_legacy"
+    pk_name = inspect(conn).get_pk_constraint(table_name).get("name")
+    conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy_name}"))
+    if conn.dialect.name == "postgresql" and pk_name:
+        conn.execute(text(f'ALTER TABLE {legacy_name} RENAME CONSTRAINT "{pk_name}" TO "{legacy_name}_pkey"'))
+    return Table(legacy_name, MetaData(), autoload_with=conn)
+
+
+def rebuild_reports(conn: Connection, reports: Table, logger: logging.Logger) -> Dict[str, str]:
+    """重建 reports，回傳使用者名稱對應的新報告 id。"""
+    legacy = rename_to_legacy(conn, "reports")
+    reports.create(conn)
+    report_ids = {}
+    now = datetime.now(timezone.utc)
+    for row in conn.execute(select(legacy)).mappings():
+        username = row["username"]
+        report_ids[username] = legacy_report_id(username)
+        report_config = row.get("report_config") or {}
+        conn.execute(reports.insert().values(
+            id=report_ids[username],
+            username=username,
+            title=report_config.get("report_topic") or None,
+            final_result=row.get("final_result"),
+            report_config=row.get("report_config"),
+            version=row.get("version") or 0,
+            updated_at=row.get("updated_at") or now
+        ))
+    legacy.drop(conn)
+    logger.info(f"Upgraded reports table: {len(report_ids)} reports re-keyed by id")
+    return report_ids
+
+
+def rebuild_keyed_by_user(conn: Connection, table: Table, logger: logging.Logger):
+    """重建以 username 為鍵的中間產物表；沒有對應報告的資料捨棄（之後重新生成即可）。"""
+    legacy = rename_to_legacy(conn, table.name)
+    table.create(conn)
+    existing_ids = set(conn.execute(text("SELECT id FROM reports")).scalars())
+    copied = 0
+    for row in conn.execute(select(legacy)).mappings():
+        report_id = legacy_report_id(row["username"])
+        if report_id not in existing_ids:
+            continue
+        values = {column.name: row.get(column.name) for column in table.columns if column.name != "report_id"}
+        conn.execute(table.insert().values(report_id=report_id, **values))
+        copied += 1
+    legacy.drop(conn)
+    logger.info(f"Upgraded {table.name} table: {copied} rows re-keyed by report id")
+
+
+def add_missing_columns(conn: Connection, table: Table, logger: logging.Logger):
+    existing = column_names(conn, table.name)
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable or column.primary_key:
+            logger.error(f"Cannot add required column {table.name}.{column.name} automatically")
+            continue
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        logger.info(f"Added column {table.name}.{column.name}")
+
+
+def add_missing_indexes(conn: Connection, table: Table, logger: logging.Logger):
+    existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            index.create(conn)
+            logger.info(f"Created index {index.name}")
@@ -0,0 +1,164 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+# 中日韓統一表意文字（含擴充 A 與相容表意文字）
+CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+TOKEN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[A-Za-z0-9]+")
+
+
+def tokenize_runs(content: str) -> List[List[str]]:
+    """
+    將文字切成詞段：連續的中文字以重疊的二字詞（bigram）表示，英數字以小寫單字表示。
+    單一中文字保留為一個字。
+    """
+    runs = []
+    for run in TOKEN_PATTERN.findall(content):
+        if CJK_PATTERN.fullmatch(run):
+            runs.append([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+        else:
+            runs.append([run.lower()])
+    return runs
+
+
+def index_tokens(content: str) -> str:
+    return " ".join(token for run in tokenize_runs(content) for token in run)
+
+
+def snippet(content: str, query: str, width: int = 60) -> str:
+    """取出第一個命中的詞段前後的文字，命中部分以 ** 標示。"""
+    terms = TOKEN_PATTERN.findall(query)
+    lowered = content.lower()
+    for term in terms:
+        position = lowered.find(term.lower())
+        if position < 0:
+            continue
+        start = max(0, position - width // 2)
+        end = min(len(content), position + len(term) + width // 2)
+        return (
+            ("..." if start > 0 else "")
+            + content[start:position]
+            + f"**{content[position:position + len(term)]}**"
+            + content[position + len(term):end]
+            + ("..." if end < len(content) else "")
+        ).replace("\n", " ")
+    return content[:width].replace("\n", " ") + ("..." if len(content) > width else "")
+
+
+class SearchIndex:
+    """
+    報告內容與來源文字的全文檢索。
+    Postgres 以 tsvector（simple 設定）加上 GIN 索引，SQLite 以 FTS5 虛擬表作為本地替代；
+    兩者都索引預先切好的 bigram 詞段，中文查詢以詞組（相鄰詞段）比對。
+
+    kind 為 "section"（ref 為主要部分名稱）或 "source"（ref 為連結）。
+    """
+
+    def __init__(self, dialect_name: str):
+        self.sqlite = dialect_name == "sqlite"
+
+    def create(self, engine):
+        with engine.begin() as conn:
+            if self.sqlite:
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents "
+                    "USING fts5(report_id UNINDEXED, kind UNINDEXED, ref UNINDEXED, content UNINDEXED, tokens)"
+                ))
+            else:
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS search_documents ("
+                    "report_id VARCHAR(64), kind VARCHAR(16), ref TEXT, content TEXT, tokens TSVECTOR, "
+                    "PRIMARY KEY (report_id, kind, ref))"
+                ))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_search_documents_tokens ON search_documents USING GIN (tokens)"
+                ))
+
+    def index(self, db, report_id: str, kind: str, ref: str, content: str):
+        """寫入或取代一筆文件，由呼叫端負責 commit。"""
+        self.remove(db, report_id, kind, ref)
+        tokens = "to_tsvector('simple', :tokens)" if not self.sqlite else ":tokens"
+        db.execute(
+            text(f"INSERT INTO search_documents (report_id, kind, ref, content, tokens) "
+                 f"VALUES (:report_id, :kind, :ref, :content, {tokens})"),
+            {"report_id": report_id, "kind": kind, "ref": ref, "content": content, "tokens": index_tokens(content)}
+        )
+
+    def remove(self, db, report_id: str, kind: Optional[str] = None, ref: Optional[str] = None):
+        conditions = ["report_id = :report_id"]
+        if kind is not None:
+            conditions.append("kind = :kind")
+        if ref is not None:
+            conditions.append("ref = :ref")
+        db.execute(
+            text(f"DELETE FROM search_documents WHERE {' AND '.join(conditions)}"),
+            {"report_id": report_id, "kind": kind, "ref": ref}
+        )
+
+    def refs(self, db, report_id: str, kind: str) -> List[str]:
+        """列出報告中某類文件的 ref。"""
+        rows = db.execute(
+            text("SELECT ref FROM search_documents WHERE report_id = :report_id AND kind = :kind"),
+            {"report_id": report_id, "kind": kind}
+        )
+        return [row.ref for row in rows]
+
+    def build_query(self, query: str) -> Optional[str]:
+        """將使用者輸入轉為 FTS5 MATCH / to_tsquery 語法，各詞段之間為 AND。"""
+        clauses = []
+        for run in tokenize_runs(query):
+            if len(run) == 1 and len(run[0]) == 1 and CJK_PATTERN.fullmatch(run[0]):
+                # 單一中文字以前綴比對所有以該字開頭的 bigram
+                clauses.append(f"{run[0]}*" if self.sqlite else f"{run[0]}:*")
+            elif self.sqlite:
+                clauses.append('"' + " ".join(run) + '"')
+            else:
+                clauses.append("(" + " <-> ".join(run) + ")")
+        if not clauses:
+            return None
+        return (" AND " if self.sqlite else " & ").join(clauses)
+
+    async def search(
+        self,
+        db,
+        username: str,
+        query: str,
+        limit: int = 20,
+        kind: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """搜尋使用者所有報告的內容與來源，依相關度排序並附上片段。"""
+        match = self.build_query(query)
+        if match is None:
+            return []
+        params = {"match": match, "username": username, "limit": limit, "kind": kind}
+        kind_filter = "AND search_documents.kind = :kind" if kind else ""
+        if self.sqlite:
+            statement = text(
+                "SELECT search_documents.report_id, reports.title, search_documents.kind, "
+                "search_documents.ref, search_documents.content, -bm25(search_documents) AS score "
+                "FROM search_documents JOIN reports ON reports.id = search_documents.report_id "
+                f"WHERE search_documents MATCH :match AND reports.username = :username {kind_filter} "
+                "ORDER BY score DESC LIMIT :limit"
+            )
+        else:
+            statement = text(
+                "SELECT search_documents.report_id, reports.title, search_documents.kind, "
+                "search_documents.ref, search_documents.content, ts_rank(search_documents.tokens, query) AS score "
+                "FROM search_documents JOIN reports ON reports.id = search_documents.report_id, "
+                "to_tsquery('simple', :match) AS query "
+                f"WHERE search_documents.tokens @@ query AND reports.username = :username {kind_filter} "
+                "ORDER BY score DESC LIMIT :limit"
+            )
+        rows = (await db.execute(statement, params)).all()
+        return [
+            {
+                "report_id": row.report_id,
+                "title": row.title,
+                "kind": row.kind,
+                "ref": row.ref,
+                "snippet": snippet(row.content, query),
+                "score": round(float(row.score), 4)
+            }
+            for row in rows
+        ]
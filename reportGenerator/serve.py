@@ -0,0 +1,19 @@
+import os
+
+import uvicorn
+
+
+def main(app=None):
+    """
+    啟動 api_auth 的 API 伺服器。
+    以本檔作為進入點時主程式不載入 api_auth：匯出 docx / pdf 的 spawn process 會重新執行主程式（__mp_main__），
+    因此主程式應保持精簡，不在每個匯出 process 中重新初始化整個應用程式。
+    """
+    workers = int(os.getenv("API_WORKERS", "1"))
+    if workers > 1 and os.getenv("SESSION_STORE_URL") == "memory":
+        raise RuntimeError("SESSION_STORE_URL=memory cannot be shared between workers")
+    uvicorn.run(app if app is not None and workers == 1 else "api_auth:app", host="0.0.0.0", port=8000, workers=workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+
+def estimate_size(obj) -> int:
+    """粗略估計由 dict / list / str 組成的資料所佔的位元組數（字串以 UTF-8 計算）。"""
+    if isinstance(obj, str):
+        return len(obj.encode("utf-8"))
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(estimate_size(key) + estimate_size(value) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sum(estimate_size(value) for value in obj)
+    return 8
+
+
+class SessionRegistry:
+    """
+    有上限的 session 登錄表，取代無限增長的 dict。
+
+    - 超過 max_entries 或估計記憶體超過 max_bytes 時，移除最久未使用的項目
+    - 閒置超過 ttl_seconds 的項目會在下一次掃描時移除
+    - 未命中時呼叫 factory(key) 建立項目，factory 可從資料庫重新載入狀態
+
+    max_entries、ttl_seconds、max_bytes 設為 0 表示不限制。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], Any],
+        max_entries: int = 0,
+        ttl_seconds: float = 0,
+        max_bytes: int = 0,
+        size_of: Optional[Callable[[Any], int]] = None,
+        sweep_interval: float = 60,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.factory = factory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.size_of = size_of or (lambda value: 0)
+        self.sweep_interval = sweep_interval
+        self.logger = logger or logging.getLogger(__name__)
+
+        # key -> [value, last_access, size]，順序即最近使用順序
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """取得項目並更新使用時間，未命中時以 factory 建立。"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_sweep >= self.sweep_interval:
+                self._evict_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                entry[1] = now
+                self._entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+
+        # factory 可能存取資料庫，不在鎖內執行
+        value = self.factory(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # 同一個 key 已由其他請求建立
+                return entry[0]
+            self._insert(key, value)
+            return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self.pop(key)
+            self._insert(key, value)
+
+    def resize(self, key: str):
+        """
+        項目的內容變動後重新估計大小，超過上限時移除最久未使用的其他項目。
+        大小在鎖外計算，不阻塞其他 session 的存取。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return
+        try:
+            size = self.size_of(entry[0])
+        except Exception as e:
+            self.logger.warning(f"Failed to estimate session size: {str(e)}")
+            return
+        with self._lock:
+            if self._entries.get(key) is not entry:
+                return
+            self._total_bytes += size - entry[2]
+            entry[2] = size
+            self._evict_over_limit(keep=key)
+
+    def pop(self, key: str, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self._total_bytes -= entry[2]
+            return entry[0]
+
+    def pop_prefix(self, prefix: str) -> List[Any]:
+        """移除鍵以 prefix 開頭的所有項目（例如某位使用者的所有 session），回傳被移除的值。"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            return [self.pop(key) for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def evict_expired(self) -> int:
+        """立即移除所有閒置超過 TTL 的項目，回傳移除數量。"""
+        with self._lock:
+            return self._evict_expired(time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "estimated_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _insert(self, key: str, value):
+        entry = [value, time.monotonic(), 0]
+        self._entries[key] = entry
+        self._resize(entry)
+        self._evict_over_limit(keep=key)
+
+    def _resize(self, entry: list):
+        try:
+            size = self.size_of(entry[0])
+        except Exception as e:
+            self.logger.warning(f"Failed to estimate session size: {str(e)}")
+            size = entry[2]
+        self._total_bytes += size - entry[2]
+        entry[2] = size
+
+    def _evict_expired(self, now: float) -> int:
+        self._last_sweep = now
+        if not self.ttl_seconds:
+            return 0
+        expired = [key for key, entry in self._entries.items() if now - entry[1] > self.ttl_seconds]
+        for key in expired:
+            self._evict(key, "idle")
+        return len(expired)
+
+    def _evict_over_limit(self, keep: str):
+        # keep 為目前使用中的項目，永遠不會被移除
+        self._entries.move_to_end(keep)
+        while len(self._entries) > 1 and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self._total_bytes > self.max_bytes)
+        ):
+            self._evict(next(iter(self._entries)), "capacity")
+
+    def _evict(self, key: str, reason: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry[2]
+        self.evictions += 1
+        self.logger.info(
+            f"Evicted session {key} ({reason}); entries={len(self._entries)}, estimated_bytes={self._total_bytes}"
+        )
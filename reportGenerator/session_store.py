@@ -0,0 +1,234 @@
+import json
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, Column, String, Integer, LargeBinary, DateTime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+
+Base = declarative_base()
+
+
+class SessionState(Base):
+    __tablename__ = 'session_states'
+
+    session_key = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    state = Column(LargeBinary)  # zlib 壓縮的 JSON
+    updated_at = Column(DateTime(timezone=True))
+
+
+class StaleSessionError(Exception):
+    """保存時發現儲存中的版本已被其他 worker 更新。"""
+
+
+def merge_states(base: Any, local: Any, remote: Any) -> Any:
+    """
+    三方合併：將 local 相對於 base 的變更套用到 remote（其他 worker 保存的較新狀態）上。
+    字典逐鍵遞迴合併，未變更的鍵保留 remote 的值；其他型別的值有變更時以 local 為準。
+    """
+    if not (isinstance(base, dict) and isinstance(local, dict) and isinstance(remote, dict)):
+        return local
+    merged = dict(remote)
+    for key in base.keys() | local.keys():
+        if key not in local:
+            merged.pop(key, None)
+        elif key not in base or key not in remote:
+            if local.get(key) != base.get(key):
+                merged[key] = local[key]
+        elif local[key] != base[key]:
+            merged[key] = merge_states(base[key], local[key], remote[key])
+    return merged
+
+
+class SessionStore(ABC):
+    """
+    session 狀態的外部儲存介面，讓任何 worker / 節點都能取得同一使用者的狀態。
+    每次保存都會遞增版本，本地快取以版本判斷是否需要重新載入。
+    ttl_seconds 不為 0 時，保存時每隔 prune_interval 秒刪除一次超過 ttl_seconds 未更新的狀態。
+    """
+
+    ttl_seconds = 0
+    prune_interval = 300.0
+    _last_prune = 0.0
+
+    @abstractmethod
+    def get_version(self, key: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def load(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        ...
+
+    @abstractmethod
+    def save(self, key: str, state: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        """
+        保存狀態並回傳新版本。
+        expected_version 不為 None 且與儲存中的版本不同時拋出 StaleSessionError。
+        """
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        """刪除鍵以 prefix 開頭的所有狀態。"""
+
+    @abstractmethod
+    def prune(self, max_age_seconds: float) -> int:
+        """刪除超過 max_age_seconds 未更新的狀態，回傳刪除數量。"""
+
+    def maybe_prune(self) -> int:
+        if not self.ttl_seconds:
+            return 0
+        now = time.monotonic()
+        if now - self._last_prune < self.prune_interval:
+            return 0
+        self._last_prune = now
+        return self.prune(self.ttl_seconds)
+
+
+class InMemorySessionStore(SessionStore):
+    """單一程序使用的儲存，不跨 worker 共享。"""
+
+    def __init__(self, ttl_seconds: float = 0):
+        self.ttl_seconds = ttl_seconds
+        self._states: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._updated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get_version(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._states.get(key)
+            return entry[0] if entry else None
+
+    def load(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            return self._states.get(key)
+
+    def save(self, key: str, state: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        with self._lock:
+            current = self._states.get(key)
+            current_version = current[0] if current else 0
+            if expected_version is not None and expected_version != current_version:
+                raise StaleSessionError(key)
+            self._states[key] = (current_version + 1, state)
+            self._updated_at[key] = time.monotonic()
+        self.maybe_prune()
+        return current_version + 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._states.pop(key, None)
+            self._updated_at.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._states if key.startswith(prefix)]:
+                self._states.pop(key)
+                self._updated_at.pop(key, None)
+
+    def prune(self, max_age_seconds: float) -> int:
+        cutoff = time.monotonic() - max_age_seconds
+        with self._lock:
+            expired = [key for key, updated_at in self._updated_at.items() if updated_at < cutoff]
+            for key in expired:
+                self._states.pop(key, None)
+                self._updated_at.pop(key)
+        return len(expired)
+
+
+class SQLSessionStore(SessionStore):
+    """以 SQLAlchemy 保存狀態，正式環境使用 Postgres，本地可使用 SQLite。"""
+
+    def __init__(self, url: Optional[str] = None, engine=None, ttl_seconds: float = 0):
+        self.ttl_seconds = ttl_seconds
+        self.engine = engine or create_engine(url)
+        Base.metadata.create_all(self.engine)
+        self.SessionLocal = sessionmaker(bind=self.engine)
+
+    def get_version(self, key: str) -> Optional[int]:
+        db = self.SessionLocal()
+        try:
+            return db.query(SessionState.version).filter(SessionState.session_key == key).scalar()
+        finally:
+            db.close()
+
+    def load(self, key: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        db = self.SessionLocal()
+        try:
+            row = db.query(SessionState).filter(SessionState.session_key == key).first()
+            if row is None:
+                return None
+            return row.version, json.loads(zlib.decompress(row.state).decode("utf-8"))
+        finally:
+            db.close()
+
+    def save(self, key: str, state: Dict[str, Any], expected_version: Optional[int] = None) -> int:
+        payload = zlib.compress(json.dumps(state, ensure_ascii=False).encode("utf-8"))
+        now = datetime.now(timezone.utc)
+        db = self.SessionLocal()
+        try:
+            row = db.query(SessionState).filter(SessionState.session_key == key).with_for_update().first()
+            current_version = row.version if row else 0
+            if expected_version is not None and expected_version != current_version:
+                db.rollback()
+                raise StaleSessionError(key)
+            if row:
+                row.version = current_version + 1
+                row.state = payload
+                row.updated_at = now
+            else:
+                db.add(SessionState(session_key=key, version=1, state=payload, updated_at=now))
+            try:
+                db.commit()
+            except IntegrityError as e:
+                # 其他 worker 同時建立了同一個 key
+                db.rollback()
+                raise StaleSessionError(key) from e
+        finally:
+            db.close()
+        self.maybe_prune()
+        return current_version + 1
+
+    def delete(self, key: str):
+        db = self.SessionLocal()
+        try:
+            db.query(SessionState).filter(SessionState.session_key == key).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def delete_prefix(self, prefix: str):
+        db = self.SessionLocal()
+        try:
+            db.query(SessionState).filter(SessionState.session_key.startswith(prefix, autoescape=True)).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def prune(self, max_age_seconds: float) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+        db = self.SessionLocal()
+        try:
+            deleted = db.query(SessionState).filter(SessionState.updated_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+def create_session_store(url: str, engine=None, ttl_seconds: float = 0) -> SessionStore:
+    """
+    依 url 建立儲存："memory" 為單一程序的記憶體儲存，其餘視為資料庫 URL。
+    傳入 engine 時沿用該連線池。
+    """
+    if url == "memory":
+        return InMemorySessionStore(ttl_seconds=ttl_seconds)
+    return SQLSessionStore(url, engine=engine, ttl_seconds=ttl_seconds)
@@ -0,0 +1,52 @@
+import concurrent.futures
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from cancellation import wait_result
+from metrics import MetricsRegistry
+
+
+class SingleFlight:
+    """
+    相同 key 的並行呼叫只執行一次：第一個呼叫者執行 func，
+    執行期間抵達的其他呼叫者等待並共用同一個結果（或例外）。
+    呼叫結束後 key 即移除，之後的呼叫會重新執行，結果不做快取。
+    等待中的呼叫者自己的工作被取消時立即拋出 GenerationCancelled，不等待第一個呼叫者。
+    """
+
+    def __init__(self, name: str, metrics: Optional[MetricsRegistry] = None):
+        self.name = name
+        self.metrics = metrics
+        self._calls: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any]):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+        if not leader:
+            self._count("suppressed")
+            return wait_result(future)
+
+        self._count("calls")
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def _count(self, event: str):
+        if self.metrics is not None:
+            self.metrics.increment(f"{self.name}.{event}")
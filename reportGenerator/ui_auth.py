@@ -234,6 +234,13 @@ def generate_recommend_main_sections(api_config, report_topic):
             st.error(f"Error: {response.status_code} - {response.text}")
             return None
 
+def format_wait(seconds):
+    """將預估等待秒數轉為易讀的文字。"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} seconds"
+    return f"{seconds // 60} min {seconds % 60} s"
+
 def reset_states():
     """
     重置所有相關的 session_state 變量到其初始狀態。
@@ -458,11 +465,22 @@ def generate_report(api_config):
         access_token = get_access_token()
         headers = {"Authorization": f"Bearer {access_token}"} if access_token else {}
 
-        with st.spinner("Generating report..."):
+        spinner_text = "Generating report..."
+        estimate_response = requests.post(f"{API_BASE_URL}/generation_estimate", json=data, headers=headers, verify=False)
+        if estimate_response.status_code == 200:
+            estimate = estimate_response.json()
+            if estimate["decision"] == "queue":
+                spinner_text = f"Waiting in queue (position {estimate['queue_position']}, about {format_wait(estimate['estimated_wait'])}), then generating report..."
+
+        with st.spinner(spinner_text):
             response = requests.post(f"{API_BASE_URL}/generate_report", json=data, headers=headers, verify=False)
             if response.status_code == 200:
                 result = response.json()
                 st.success(f"Report generated successfully. Total time: {result['total_time']} seconds.")
+            elif response.status_code == 429:
+                detail = response.json()["detail"]
+                retry_after = int(response.headers.get("Retry-After", "0"))
+                st.warning(f"The server is busy (queue position {detail['queue_position']}). Please try again in {format_wait(retry_after)}.")
             else:
                 st.error(f"Error: {response.status_code} - {response.text}")
 
@@ -555,6 +573,16 @@ def get_report(api_config):
                 col1, col2 = st.columns([2, 1])
                 with col1:
                     download_report(headers)
+                    if st.button("Refresh Summary", use_container_width=True, help="Recompute only the parts affected by edited sections."):
+                        with st.spinner("Refreshing report..."):
+                            refresh_response = requests.post(f"{API_BASE_URL}/refresh_report", json={"openai_config": api_config}, headers=headers)
+                        if refresh_response.status_code == 200:
+                            refreshed = refresh_response.json()["refreshed"]
+                            st.success(f"Refreshed: {', '.join(refreshed)}" if refreshed else "Report is already up to date.")
+                            time.sleep(2)
+                            st.rerun()
+                        else:
+                            st.error(f"Error: {refresh_response.status_code} - {refresh_response.text}")
                 with col2:
                     if st.button("Back to Report Generation", use_container_width=True):
                         if 'redirect_to_report' in st.session_state:
@@ -778,6 +806,11 @@ def reprocess_content(api_config):
                     st.warning("Request format error. Please include the section you want to modify and the modified content.")
                 else:
                     st.error(f"Error: {response.text}")
+            elif response.status_code == 404:
+                # 使用者還沒有任何報告時，後端在取得報告前就回傳 404
+                st.warning("Please generate a report first.")
+            else:
+                st.error(f"Error: {response.status_code} - {response.text}")
 
         time.sleep(3)
         st.session_state.reprocess_clicked = False
@@ -799,7 +832,8 @@ def reprocess_content(api_config):
                 "openai_config": api_config,
                 "links": links_list if more_info_from_links else None,
                 "style_selection": style_selection,
-                "user_decision": user_decision_bool
+                "user_decision": user_decision_bool,
+                "continuation_token": detail.get("continuation_token")
             }
             headers = {"Authorization": f"Bearer {access_token}"} if access_token else {}
             with st.spinner("Reprocessing report with user decision..."):
@@ -0,0 +1,177 @@
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import MetricsRegistry
+from scheduling import WORKLOAD_RANKS, current_work
+
+
+class WorkGroup:
+    """
+    同一個請求（例如一次 generate_report）送出的工作。
+    以 with 使用；離開時尚未開始的工作會被取消。
+    工作類別取自建立時的 scheduling.current_work，工作在提交時的 context 中執行。
+    """
+
+    def __init__(self, pool: "WorkPool", owner: str):
+        self.pool = pool
+        self.owner = owner
+        self.rank = WORKLOAD_RANKS[current_work()[1]]
+        self.running = 0
+        self._pending = deque()
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        context = contextvars.copy_context()
+        self.pool._enqueue(self, future, lambda: context.run(func, *args, **kwargs))
+        return future
+
+    def cancel_pending(self) -> int:
+        """取消尚未開始的工作，回傳取消的數量。"""
+        return self.pool._cancel_pending(self)
+
+    def __enter__(self):
+        self.pool._register(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cancel_pending()
+        self.pool._unregister(self)
+        return False
+
+
+class WorkPool:
+    """
+    程序內共用的工作執行緒池。
+
+    - 執行緒總數固定為 max_workers，不隨並行請求數增加
+    - 每個 WorkGroup（請求）同時執行的工作不超過 request_quota，
+      同一使用者所有請求合計不超過 user_quota；超出配額的工作在各自的 group 中排隊
+    - 互動操作的 group 優先，同類別的 group 輪流取得空出的執行緒；所有 group 都已達配額而仍有空閒執行緒時，
+      排隊中的工作可以暫時借用，避免機器閒置。借用時保留 request_quota 個執行緒，
+      讓新進的請求不必等待正在執行的工作結束
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int = 32,
+        request_quota: int = 5,
+        user_quota: int = 10,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        self.name = name
+        self.max_workers = max_workers
+        self.request_quota = request_quota
+        self.user_quota = user_quota
+        self.metrics = metrics
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._groups: List[WorkGroup] = []
+        self._user_running: Dict[str, int] = {}
+        self._running = 0
+        self._next_group = 0
+
+    def group(self, owner: str) -> WorkGroup:
+        return WorkGroup(self, owner)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = sum(len(group._pending) for group in self._groups)
+            return {
+                "max_workers": self.max_workers,
+                "running": self._running,
+                "queued": queued,
+                "groups": len(self._groups),
+                "users": len(self._user_running),
+                "saturation": round(self._running / self.max_workers, 2)
+            }
+
+    def _register(self, group: WorkGroup):
+        with self._lock:
+            self._groups.append(group)
+
+    def _unregister(self, group: WorkGroup):
+        with self._lock:
+            if group in self._groups:
+                self._groups.remove(group)
+
+    def _enqueue(self, group: WorkGroup, future: concurrent.futures.Future, task: Callable[[], Any]):
+        with self._lock:
+            if group not in self._groups:
+                self._groups.append(group)
+            group._pending.append((future, task, time.monotonic()))
+            self._dispatch()
+
+    def _cancel_pending(self, group: WorkGroup) -> int:
+        with self._lock:
+            pending = list(group._pending)
+            group._pending.clear()
+        for future, _, _ in pending:
+            future.cancel()
+        return len(pending)
+
+    def _dispatch(self):
+        """在持有 _lock 的情況下，將排隊中的工作分派到空閒的執行緒。"""
+        for borrow in (False, True):
+            capacity = self.max_workers - self.request_quota if borrow else self.max_workers
+            while self._running < capacity:
+                group = self._next_ready(borrow)
+                if group is None:
+                    break
+                future, task, queued_at = group._pending.popleft()
+                group.running += 1
+                self._user_running[group.owner] = self._user_running.get(group.owner, 0) + 1
+                self._running += 1
+                if self.metrics is not None:
+                    self.metrics.latency(f"{self.name}.queue_wait").observe(time.monotonic() - queued_at)
+                    if borrow:
+                        self.metrics.increment(f"{self.name}.borrowed")
+                self._executor.submit(self._run, group, future, task)
+        if self.metrics is not None and self._running >= self.max_workers and any(group._pending for group in self._groups):
+            self.metrics.increment(f"{self.name}.saturated")
+
+    def _next_ready(self, borrow: bool) -> Optional[WorkGroup]:
+        """從上次分派的下一個 group 開始輪流尋找可以執行的工作，互動操作的 group 優先。"""
+        selected = None
+        count = len(self._groups)
+        for offset in range(count):
+            index = (self._next_group + offset) % count
+            group = self._groups[index]
+            if not group._pending:
+                continue
+            if not borrow and (
+                group.running >= self.request_quota
+                or self._user_running.get(group.owner, 0) >= self.user_quota
+            ):
+                continue
+            if selected is None or group.rank < selected[1].rank:
+                selected = (index, group)
+        if selected is None:
+            return None
+        self._next_group = selected[0] + 1
+        return selected[1]
+
+    def _run(self, group: WorkGroup, future: concurrent.futures.Future, task: Callable[[], Any]):
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = task()
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            with self._lock:
+                group.running -= 1
+                self._running -= 1
+                self._user_running[group.owner] -= 1
+                if not self._user_running[group.owner]:
+                    del self._user_running[group.owner]
+                self._dispatch()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,90 @@
+"""
+登入吞吐量基準測試。
+
+對執行中的 api_auth 伺服器同時送出大量 /token 請求，並在登入期間持續輪詢 /health，
+量測每秒登入數以及無關端點的延遲（p50 / p99），用來確認 bcrypt 不再阻塞事件迴圈。
+
+用法:
+    python ./reportGenerator/serve.py
+    python ./tests/bench_login.py --logins 200 --concurrency 20
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = "http://localhost:8000"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def ensure_user(username, password):
+    data = {"username": username, "password": password}
+    response = requests.post(f"{BASE_URL}/register", json=data)
+    if response.status_code not in (200, 400):
+        raise Exception(f"Failed to register benchmark user: {response.text}")
+
+
+def login(username, password):
+    start = time.perf_counter()
+    response = requests.post(f"{BASE_URL}/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def poll_health(stop_event, latencies):
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        requests.get(f"{BASE_URL}/health")
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--username", default="benchuser")
+    parser.add_argument("--password", default="benchpassword")
+    args = parser.parse_args()
+
+    ensure_user(args.username, args.password)
+
+    # 基準：沒有登入負載時的 /health 延遲
+    idle_latencies = []
+    stop_event = threading.Event()
+    poller = threading.Thread(target=poll_health, args=(stop_event, idle_latencies))
+    poller.start()
+    time.sleep(2)
+    stop_event.set()
+    poller.join()
+
+    # 登入負載期間的 /health 延遲
+    burst_latencies = []
+    stop_event = threading.Event()
+    poller = threading.Thread(target=poll_health, args=(stop_event, burst_latencies))
+    poller.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        login_latencies = list(executor.map(lambda _: login(args.username, args.password), range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop_event.set()
+    poller.join()
+
+    print(f"Logins: {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f} logins/sec, concurrency {args.concurrency})")
+    print(f"Login latency: p50={statistics.median(login_latencies) * 1000:.0f}ms p99={percentile(login_latencies, 99) * 1000:.0f}ms")
+    print(f"/health idle:  p50={statistics.median(idle_latencies) * 1000:.1f}ms p99={percentile(idle_latencies, 99) * 1000:.1f}ms")
+    print(f"/health burst: p50={statistics.median(burst_latencies) * 1000:.1f}ms p99={percentile(burst_latencies, 99) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# reportGenerator 內的模組以檔名互相匯入（例如 from metrics import ...），測試時比照加入路徑
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reportGenerator"))
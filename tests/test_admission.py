@@ -0,0 +1,142 @@
+import asyncio
+import unittest
+
+from admission import AdmissionController, AdmissionRejected
+from cancellation import CancelToken, GenerationCancelled
+
+
+def make_controller(**kwargs) -> AdmissionController:
+    options = {"throughput": lambda: 10.0, "max_active_cost": 100, "max_queue": 2, "max_wait": 60.0}
+    options.update(kwargs)
+    return AdmissionController("test", **options)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_estimate(self):
+        controller = make_controller()
+        self.assertEqual(controller.estimate(50)["decision"], "run")
+        controller.active_cost = 80
+        estimate = controller.estimate(50)
+        self.assertEqual(estimate["decision"], "queue")
+        self.assertEqual(estimate["queue_position"], 1)
+        # 需要先完成 80 + 50 - 100 = 30 的 cost，每秒 10
+        self.assertEqual(estimate["estimated_wait"], 3.0)
+        self.assertEqual(controller.estimate(1000)["decision"], "reject")
+
+    def test_oversized_request_runs_when_idle(self):
+        controller = make_controller()
+        self.assertEqual(controller.estimate(500)["decision"], "run")
+
+    def test_queued_request_runs_after_release(self):
+        async def scenario():
+            controller = make_controller()
+            order = []
+            first_admitted = asyncio.Event()
+            release_first = asyncio.Event()
+
+            async def first():
+                async with controller.admit(80):
+                    first_admitted.set()
+                    await release_first.wait()
+                    order.append("first")
+
+            async def second():
+                async with controller.admit(50) as queue_wait:
+                    order.append("second")
+                    return queue_wait
+
+            first_task = asyncio.create_task(first())
+            await first_admitted.wait()
+            second_task = asyncio.create_task(second())
+            await asyncio.sleep(0.01)
+            self.assertEqual(controller.stats()["queued"], 1)
+            release_first.set()
+            await first_task
+            queue_wait = await second_task
+            self.assertEqual(order, ["first", "second"])
+            self.assertGreater(queue_wait, 0)
+            self.assertEqual(controller.active_cost, 0)
+
+        asyncio.run(scenario())
+
+    def test_reject_when_queue_full(self):
+        async def scenario():
+            controller = make_controller(max_queue=1)
+            release = asyncio.Event()
+
+            async def hold(cost):
+                async with controller.admit(cost):
+                    await release.wait()
+
+            tasks = [asyncio.create_task(hold(100)), asyncio.create_task(hold(10))]
+            await asyncio.sleep(0.01)
+            with self.assertRaises(AdmissionRejected) as context:
+                async with controller.admit(10):
+                    pass
+            self.assertGreaterEqual(context.exception.retry_after, 1)
+            release.set()
+            await asyncio.gather(*tasks)
+            self.assertEqual(controller.stats()["queued"], 0)
+
+        asyncio.run(scenario())
+
+    def test_cancelled_while_queued(self):
+        async def scenario():
+            controller = make_controller()
+            token = CancelToken()
+            release = asyncio.Event()
+
+            async def hold():
+                async with controller.admit(100):
+                    await release.wait()
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+
+            async def queued():
+                async with controller.admit(10, token):
+                    pass
+
+            waiter = asyncio.create_task(queued())
+            await asyncio.sleep(0.01)
+            token.cancel("user")
+            with self.assertRaises(GenerationCancelled):
+                await waiter
+            self.assertEqual(controller.stats()["queued"], 0)
+            release.set()
+            await holder
+            self.assertEqual(controller.active_cost, 0)
+
+        asyncio.run(scenario())
+
+    def test_client_disconnect_while_queued(self):
+        async def scenario():
+            controller = make_controller()
+            release = asyncio.Event()
+
+            async def hold():
+                async with controller.admit(100):
+                    await release.wait()
+
+            holder = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+
+            async def queued():
+                async with controller.admit(10):
+                    pass
+
+            waiter = asyncio.create_task(queued())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            self.assertEqual(controller.stats()["queued"], 0)
+            release.set()
+            await holder
+            self.assertEqual(controller.active_cost, 0)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
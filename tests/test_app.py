@@ -1,4 +1,9 @@
+import io
+import os
 import unittest
+import uuid
+import zipfile
+
 import requests
 import json
 
@@ -103,5 +108,188 @@ class TestFastAPIApp(unittest.TestCase):
         # Clean up: delete the test user if needed
         pass
 
+
+class TestReportEndpoints(unittest.TestCase):
+    """不需要呼叫 LLM 的端點：每次以新的使用者執行，確保還沒有任何報告。"""
+
+    @classmethod
+    def setUpClass(cls):
+        data = {"username": f"testuser_{uuid.uuid4().hex[:8]}", "password": "testpassword"}
+        response = requests.post(f"{BASE_URL}/register", json=data)
+        if response.status_code != 200:
+            raise Exception("Failed to register")
+        cls.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        cls.report_request = {
+            "report_topic": "電池技術發展",
+            "main_sections": {"全球電池市場概況": ["市場規模", "主要參與者"]},
+            "links": ["https://yez.one/post/batterycell"],
+            "openai_config": None
+        }
+
+    def test_01_read_without_report_returns_404(self):
+        for path in ("/get_report", "/get_report_sections", "/report_versions", "/download_report?format=md"):
+            response = requests.get(f"{BASE_URL}{path}", headers=self.headers)
+            self.assertEqual(response.status_code, 404, path)
+
+    def test_02_unknown_report_id(self):
+        response = requests.get(f"{BASE_URL}/get_report", params={"report_id": uuid.uuid4().hex}, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_03_list_reports_empty(self):
+        response = requests.get(f"{BASE_URL}/reports", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"result": [], "next_cursor": None})
+
+    def test_04_search(self):
+        response = requests.get(f"{BASE_URL}/search", params={"q": "固態電池"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["result"], [])
+        response = requests.get(f"{BASE_URL}/search", params={"q": "電池", "kind": "other"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_05_generation_estimate(self):
+        response = requests.post(f"{BASE_URL}/generation_estimate", json=self.report_request, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertIn(result["decision"], ("run", "queue", "reject"))
+        self.assertGreater(result["cost"], 0)
+        self.assertIn("estimated_wait", result)
+
+    def test_06_cancel_generation(self):
+        response = requests.post(f"{BASE_URL}/cancel_generation", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"report_id": None, "cancelled": 0})
+        response = requests.post(f"{BASE_URL}/cancel_generation", params={"report_id": uuid.uuid4().hex}, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_07_export_reports(self):
+        response = requests.get(f"{BASE_URL}/export_reports", params={"format": "md"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(response.content)).namelist(), [])
+        response = requests.get(f"{BASE_URL}/export_reports", params={"format": "exe"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_08_health_and_metrics(self):
+        response = requests.get(f"{BASE_URL}/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("sessions", response.json())
+        # /metrics 只在伺服器設定 METRICS_TOKEN 時開放，測試時以相同的環境變數執行
+        metrics_token = os.getenv("METRICS_TOKEN")
+        response = requests.get(f"{BASE_URL}/metrics")
+        if not metrics_token:
+            self.assertEqual(response.status_code, 404)
+            return
+        self.assertEqual(response.status_code, 401)
+        response = requests.get(f"{BASE_URL}/metrics", headers={"X-Metrics-Token": "wrong"})
+        self.assertEqual(response.status_code, 401)
+        response = requests.get(f"{BASE_URL}/metrics", headers={"X-Metrics-Token": metrics_token})
+        self.assertEqual(response.status_code, 200)
+        gauges = response.json()["gauges"]
+        for name in ("llm_governor", "work_pool", "admission", "sessions"):
+            self.assertIn(name, gauges)
+
+    def test_09_logout(self):
+        response = requests.get(f"{BASE_URL}/logout", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+
+class TestReportLifecycle(unittest.TestCase):
+    """生成一份報告後，依 report_id 讀取、列出、搜尋、查看版本與匯出。"""
+
+    @classmethod
+    def setUpClass(cls):
+        data = {"username": f"testuser_{uuid.uuid4().hex[:8]}", "password": "testpassword"}
+        response = requests.post(f"{BASE_URL}/register", json=data)
+        if response.status_code != 200:
+            raise Exception("Failed to register")
+        cls.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        data = {
+            "report_topic": "電池技術發展",
+            "main_sections": {"全球電池市場概況": ["市場規模", "主要參與者"]},
+            "links": ["https://yez.one/post/batterycell"],
+            "openai_config": {
+                "azure_key": "b071280275a248ba91504f7256bce665",
+                "azure_base": "https://interactive-query.openai.azure.com/"
+            }
+        }
+        response = requests.post(f"{BASE_URL}/generate_report", json=data, headers=cls.headers)
+        if response.status_code != 200:
+            raise Exception(f"Failed to generate report: {response.status_code}")
+        cls.generated = response.json()
+        cls.params = {"report_id": cls.generated["report_id"]}
+
+    def test_01_generate_result(self):
+        for key in ("result", "total_time", "report_id", "cached", "queue_wait"):
+            self.assertIn(key, self.generated)
+
+    def test_02_list_reports(self):
+        response = requests.get(f"{BASE_URL}/reports", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        reports = response.json()["result"]
+        self.assertEqual([report["report_id"] for report in reports], [self.params["report_id"]])
+        self.assertEqual(reports[0]["title"], "電池技術發展")
+
+    def test_03_get_report_with_etag(self):
+        response = requests.get(f"{BASE_URL}/get_report", params=self.params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["result"], self.generated["result"])
+        etag = response.headers["ETag"]
+        response = requests.get(f"{BASE_URL}/get_report", params=self.params, headers={**self.headers, "If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_04_sections(self):
+        response = requests.get(f"{BASE_URL}/get_report_sections", params=self.params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([section["main_section"] for section in response.json()["result"]], list(self.generated["result"]))
+        response = requests.get(f"{BASE_URL}/get_section", params={**self.params, "main_section": "全球電池市場概況"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["result"]["全球電池市場概況"], self.generated["result"]["全球電池市場概況"])
+
+    def test_05_versions(self):
+        data = {"main_section": "全球電池市場概況", "new_content": "這是更新後的全球電池市場概況內容。"}
+        response = requests.post(f"{BASE_URL}/save_reprocessed_content", params=self.params, json=data, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        response = requests.get(f"{BASE_URL}/report_versions", params=self.params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        versions = [entry["version"] for entry in response.json()["result"]]
+        self.assertGreaterEqual(len(versions), 2)
+        response = requests.get(f"{BASE_URL}/report_diff", params={**self.params, "from_version": min(versions), "to_version": max(versions)}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("全球電池市場概況", response.json()["result"]["changed"])
+        response = requests.post(f"{BASE_URL}/restore_report_version", params=self.params, json={"version": min(versions)}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["result"]["全球電池市場概況"], self.generated["result"]["全球電池市場概況"])
+
+    def test_06_search(self):
+        # 以生成內容的開頭搜尋，test_05 已還原為生成時的版本
+        query = self.generated["result"]["全球電池市場概況"][:8]
+        response = requests.get(f"{BASE_URL}/search", params={"q": query, "kind": "section"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.params["report_id"], [entry["report_id"] for entry in response.json()["result"]])
+
+    def test_07_download_report(self):
+        response = requests.get(f"{BASE_URL}/download_report", params={**self.params, "format": "md"}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("全球電池市場概況", response.text)
+        response = requests.get(f"{BASE_URL}/download_report", params={**self.params, "format": "exe"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_08_cancel_generation(self):
+        response = requests.post(f"{BASE_URL}/cancel_generation", params=self.params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"report_id": self.params["report_id"], "cancelled": 0})
+
+    def test_09_other_users_report(self):
+        data = {"username": f"testuser_{uuid.uuid4().hex[:8]}", "password": "testpassword"}
+        token = requests.post(f"{BASE_URL}/register", json=data).json()["access_token"]
+        response = requests.get(f"{BASE_URL}/get_report", params=self.params, headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_10_delete_report(self):
+        response = requests.delete(f"{BASE_URL}/delete_report", params=self.params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        response = requests.get(f"{BASE_URL}/get_report", params=self.params, headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,129 @@
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from cancellation import CancelToken, GenerationCancelled, cancel_scope, check_cancelled, current_token, sleep, wait_result
+from single_flight import SingleFlight
+
+
+class TestCancelToken(unittest.TestCase):
+    def test_cancel_runs_callbacks_once(self):
+        token = CancelToken()
+        calls = []
+        token.add_callback(lambda: calls.append("a"))
+        token.cancel("user")
+        token.cancel("again")
+        self.assertTrue(token.cancelled)
+        self.assertEqual(token.reason, "user")
+        self.assertEqual(calls, ["a"])
+
+    def test_callback_added_after_cancel_runs_immediately(self):
+        token = CancelToken()
+        token.cancel()
+        calls = []
+        token.add_callback(lambda: calls.append(1))
+        self.assertEqual(calls, [1])
+
+    def test_raise_if_cancelled(self):
+        token = CancelToken()
+        token.raise_if_cancelled()
+        token.cancel("stop")
+        with self.assertRaises(GenerationCancelled):
+            token.raise_if_cancelled()
+
+    def test_cancelled_is_not_an_exception(self):
+        # 捕捉 Exception 的錯誤處理不能吞掉取消
+        self.assertFalse(issubclass(GenerationCancelled, Exception))
+
+    def test_child_follows_parent(self):
+        parent = CancelToken()
+        child = parent.child()
+        parent.cancel("parent")
+        self.assertTrue(child.cancelled)
+        self.assertEqual(child.reason, "parent")
+
+    def test_child_cancel_does_not_affect_parent(self):
+        parent = CancelToken()
+        child = parent.child()
+        child.cancel("losing branch")
+        self.assertTrue(child.cancelled)
+        self.assertFalse(parent.cancelled)
+
+    def test_wait_returns_early_when_cancelled(self):
+        token = CancelToken()
+        threading.Timer(0.05, token.cancel).start()
+        start = time.monotonic()
+        self.assertTrue(token.wait(5))
+        self.assertLess(time.monotonic() - start, 2)
+
+
+class TestCancelScope(unittest.TestCase):
+    def test_scope_sets_and_resets_current_token(self):
+        token = CancelToken()
+        self.assertIsNone(current_token())
+        with cancel_scope(token):
+            self.assertIs(current_token(), token)
+            check_cancelled()
+            token.cancel()
+            with self.assertRaises(GenerationCancelled):
+                check_cancelled()
+        self.assertIsNone(current_token())
+        check_cancelled()
+
+    def test_sleep_is_interrupted(self):
+        token = CancelToken()
+        threading.Timer(0.05, token.cancel).start()
+        start = time.monotonic()
+        with cancel_scope(token):
+            with self.assertRaises(GenerationCancelled):
+                sleep(5)
+        self.assertLess(time.monotonic() - start, 2)
+
+
+class TestWaitResult(unittest.TestCase):
+    def test_returns_result(self):
+        future = concurrent.futures.Future()
+        threading.Timer(0.05, future.set_result, args=(42,)).start()
+        with cancel_scope(CancelToken()):
+            self.assertEqual(wait_result(future), 42)
+        self.assertEqual(wait_result(future), 42)
+
+    def test_cancelled_waiter_stops_waiting(self):
+        future = concurrent.futures.Future()
+        token = CancelToken()
+        threading.Timer(0.05, token.cancel, args=("user",)).start()
+        start = time.monotonic()
+        with cancel_scope(token):
+            with self.assertRaises(GenerationCancelled):
+                wait_result(future)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertFalse(future.done())
+
+    def test_single_flight_follower_honours_own_token(self):
+        flight = SingleFlight("test")
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "done"
+
+        leader = concurrent.futures.ThreadPoolExecutor(1)
+        leader_result = leader.submit(flight.do, "k", slow)
+        started.wait(5)
+        token = CancelToken()
+        threading.Timer(0.05, token.cancel).start()
+        start = time.monotonic()
+        with cancel_scope(token):
+            with self.assertRaises(GenerationCancelled):
+                flight.do("k", slow)
+        self.assertLess(time.monotonic() - start, 2)
+        release.set()
+        self.assertEqual(leader_result.result(5), "done")
+        leader.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
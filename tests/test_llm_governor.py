@@ -0,0 +1,179 @@
+import threading
+import time
+import unittest
+
+from cancellation import CancelToken, GenerationCancelled, cancel_scope
+from llm_governor import ConcurrencyGovernor, is_rate_limited, retry_after_seconds
+from metrics import MetricsRegistry
+
+
+class RateLimitError(Exception):
+    """模擬 openai.RateLimitError：只比對類別名稱。"""
+
+
+class StatusError(Exception):
+    def __init__(self, message: str, status_code: int, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Response:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.headers = {"retry-after": "3"}
+
+
+class TestRateLimitDetection(unittest.TestCase):
+    def test_status_code(self):
+        self.assertTrue(is_rate_limited(StatusError("Too Many Requests", 429)))
+        self.assertFalse(is_rate_limited(StatusError("Bad Request", 400)))
+
+    def test_response_status(self):
+        error = Exception("request failed")
+        error.response = Response(429)
+        self.assertTrue(is_rate_limited(error))
+        self.assertEqual(retry_after_seconds(error), 3.0)
+
+    def test_exception_type(self):
+        self.assertTrue(is_rate_limited(RateLimitError("slow down")))
+
+    def test_wrapped(self):
+        try:
+            try:
+                raise RateLimitError("slow down")
+            except RateLimitError as e:
+                raise RuntimeError("llm call failed") from e
+        except RuntimeError as e:
+            self.assertTrue(is_rate_limited(e))
+
+    def test_message_is_not_enough(self):
+        # 訊息中出現 429 或 rate limit 字樣但狀態碼不是 429 時不視為速率限制
+        self.assertFalse(is_rate_limited(ValueError("prompt has 4290 tokens, 429 over the limit")))
+        self.assertFalse(is_rate_limited(StatusError("rate limit exceeded?", 500)))
+
+    def test_retry_after_from_message(self):
+        self.assertEqual(retry_after_seconds(RateLimitError("Please retry after 7 seconds")), 7.0)
+        self.assertIsNone(retry_after_seconds(RateLimitError("slow down")))
+
+
+class TestConcurrencyGovernor(unittest.TestCase):
+    def make_governor(self, **kwargs):
+        self.metrics = MetricsRegistry()
+        options = {"initial_limit": 8, "expected_latency": 10.0, "max_retries": 0, "metrics": self.metrics}
+        options.update(kwargs)
+        return ConcurrencyGovernor("test", **options)
+
+    def counters(self):
+        return self.metrics.snapshot()["counters"]
+
+    def rate_limited(self):
+        raise StatusError("Too Many Requests", 429, {"retry-after": "0"})
+
+    def test_success_increases_limit(self):
+        governor = self.make_governor()
+        self.assertEqual(governor.call(lambda: "ok"), "ok")
+        self.assertAlmostEqual(governor.limit, 8.125)
+
+    def test_decrease_once_per_window(self):
+        # 同一波壅塞（一個平均延遲內）中的多次 429 只減少一次名額
+        governor = self.make_governor()
+        for _ in range(3):
+            with self.assertRaises(StatusError):
+                governor.call(self.rate_limited)
+        self.assertEqual(governor.limit, 4.0)
+        self.assertEqual(self.counters()["test.rate_limited"], 3)
+
+    def test_decrease_again_after_window(self):
+        governor = self.make_governor(expected_latency=0.05)
+        with self.assertRaises(StatusError):
+            governor.call(self.rate_limited)
+        time.sleep(0.1)
+        with self.assertRaises(StatusError):
+            governor.call(self.rate_limited)
+        self.assertEqual(governor.limit, 2.0)
+
+    def test_limit_not_below_minimum(self):
+        governor = self.make_governor(initial_limit=1, expected_latency=0.0)
+        for _ in range(3):
+            with self.assertRaises(StatusError):
+                governor.call(self.rate_limited)
+        self.assertEqual(governor.limit, 1.0)
+
+    def test_other_errors_do_not_decrease(self):
+        governor = self.make_governor()
+
+        def fail():
+            raise ValueError("429 tokens")
+
+        with self.assertRaises(ValueError):
+            governor.call(fail)
+        self.assertEqual(governor.limit, 8.0)
+        self.assertEqual(governor.stats()["in_flight"], 0)
+
+    def test_retry_after_rate_limit(self):
+        governor = self.make_governor(max_retries=2)
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise StatusError("Too Many Requests", 429, {"retry-after": "0.01"})
+            return "ok"
+
+        self.assertEqual(governor.call(flaky), "ok")
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(self.counters()["test.retries"], 1)
+
+    def test_limits_concurrency(self):
+        governor = self.make_governor(initial_limit=2, max_limit=2)
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def work():
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.02)
+            with lock:
+                state["running"] -= 1
+
+        threads = [threading.Thread(target=governor.call, args=(work,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(state["peak"], 2)
+
+    def test_cancelled_waiter_leaves_queue(self):
+        governor = self.make_governor(initial_limit=1, max_limit=1)
+        release = threading.Event()
+        holder = threading.Thread(target=governor.call, args=(lambda: release.wait(5),))
+        holder.start()
+        while governor.stats()["in_flight"] == 0:
+            time.sleep(0.01)
+
+        token = CancelToken()
+        errors = []
+
+        def waiter():
+            with cancel_scope(token):
+                try:
+                    governor.call(lambda: None)
+                except GenerationCancelled as e:
+                    errors.append(e)
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while governor.stats()["queued"] == 0:
+            time.sleep(0.01)
+        token.cancel("user")
+        thread.join(5)
+        release.set()
+        holder.join(5)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(governor.stats()["queued"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import hashlib
+import unittest
+
+from report_history import build_payload, decode_payload, encode_payload, rebuild, section_diff
+
+
+def hashes_of(sections):
+    return {key: hashlib.sha256(content.encode("utf-8")).hexdigest() for key, content in sections.items()}
+
+
+class TestReportHistory(unittest.TestCase):
+    def versions(self):
+        return [
+            {"前言": "電池市場\n規模", "技術": "鋰離子", "結論": "持續成長"},
+            {"前言": "電池市場\n規模擴大", "技術": "鋰離子", "結論": "持續成長"},
+            {"技術": "固態電池", "前言": "電池市場\n規模擴大", "展望": "新興市場"}
+        ]
+
+    def payloads(self):
+        payloads, previous = [], None
+        for sections in self.versions():
+            hashes = hashes_of(sections)
+            payloads.append(build_payload(sections, hashes, previous))
+            previous = hashes
+        return payloads
+
+    def test_first_version_is_full_snapshot(self):
+        first = self.payloads()[0]
+        self.assertEqual(first["sections"], self.versions()[0])
+
+    def test_delta_keeps_only_changed_sections(self):
+        payloads = self.payloads()
+        self.assertEqual(payloads[1]["sections"], {"前言": "電池市場\n規模擴大"})
+        self.assertEqual(payloads[2]["sections"], {"技術": "固態電池", "展望": "新興市場"})
+        self.assertEqual(payloads[2]["order"], ["技術", "前言", "展望"])
+
+    def test_rebuild_each_version(self):
+        payloads = self.payloads()
+        for index, sections in enumerate(self.versions()):
+            rebuilt = rebuild(payloads[:index + 1])
+            self.assertEqual(rebuilt, sections)
+            self.assertEqual(list(rebuilt), list(sections))
+
+    def test_encode_round_trip(self):
+        payload = self.payloads()[2]
+        data = encode_payload(payload)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(decode_payload(data), payload)
+
+    def test_section_diff(self):
+        old, new = self.versions()[0], self.versions()[2]
+        diff = section_diff((old, hashes_of(old)), (new, hashes_of(new)))
+        self.assertEqual(diff["added"], ["展望"])
+        self.assertEqual(diff["removed"], ["結論"])
+        self.assertEqual(sorted(diff["changed"]), ["前言", "技術"])
+        self.assertIn("+規模擴大", diff["changed"]["前言"])
+        self.assertIn("-鋰離子", diff["changed"]["技術"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from scheduling import BATCH, INTERACTIVE, RETRY_RANK, WORKLOAD_RANKS, FairQueue, current_work, parse_weights, work_context
+
+
+def drain(queue: FairQueue):
+    return [queue.pop() for _ in range(len(queue))]
+
+
+class TestFairQueue(unittest.TestCase):
+    def test_classes_in_priority_order(self):
+        queue = FairQueue()
+        queue.push("batch", "alice", WORKLOAD_RANKS[BATCH])
+        queue.push("interactive", "alice", WORKLOAD_RANKS[INTERACTIVE])
+        queue.push("retry", "alice", RETRY_RANK)
+        self.assertEqual(drain(queue), ["retry", "interactive", "batch"])
+
+    def test_users_share_within_class(self):
+        # alice 先送出三個呼叫，bob 之後送出的呼叫不必等 alice 全部完成
+        queue = FairQueue()
+        rank = WORKLOAD_RANKS[BATCH]
+        for i in range(3):
+            queue.push(f"alice-{i}", "alice", rank)
+        queue.push("bob-0", "bob", rank)
+        self.assertEqual(drain(queue), ["alice-0", "bob-0", "alice-1", "alice-2"])
+
+    def test_weights(self):
+        queue = FairQueue(weights={"alice": 2})
+        rank = WORKLOAD_RANKS[BATCH]
+        for i in range(4):
+            queue.push(f"alice-{i}", "alice", rank)
+        for i in range(2):
+            queue.push(f"bob-{i}", "bob", rank)
+        self.assertEqual(drain(queue), ["alice-0", "bob-0", "alice-1", "alice-2", "bob-1", "alice-3"])
+
+    def test_idle_user_is_not_penalised(self):
+        queue = FairQueue()
+        rank = WORKLOAD_RANKS[BATCH]
+        for i in range(3):
+            queue.push(f"alice-{i}", "alice", rank)
+        drain(queue)
+        queue.push("bob-0", "bob", rank)
+        queue.push("alice-3", "alice", rank)
+        self.assertEqual(drain(queue), ["bob-0", "alice-3"])
+
+    def test_remove(self):
+        queue = FairQueue()
+        rank = WORKLOAD_RANKS[BATCH]
+        first, second = object(), object()
+        queue.push(first, "alice", rank)
+        queue.push(second, "bob", rank)
+        queue.remove(first)
+        queue.remove(object())
+        self.assertEqual(len(queue), 1)
+        self.assertIs(queue.peek(), second)
+
+    def test_counts(self):
+        queue = FairQueue()
+        queue.push(1, "alice", RETRY_RANK)
+        queue.push(2, "alice", WORKLOAD_RANKS[BATCH])
+        queue.push(3, "bob", WORKLOAD_RANKS[BATCH])
+        self.assertEqual(queue.counts(), {"retry": 1, BATCH: 2})
+
+
+class TestWorkContext(unittest.TestCase):
+    def test_work_context(self):
+        self.assertEqual(current_work(), ("", BATCH))
+        with work_context("alice", INTERACTIVE):
+            self.assertEqual(current_work(), ("alice", INTERACTIVE))
+        self.assertEqual(current_work(), ("", BATCH))
+
+    def test_parse_weights(self):
+        self.assertEqual(parse_weights("alice=2, bob=0.5,bad,carol=x,dave=0"), {"alice": 2.0, "bob": 0.5})
+        self.assertEqual(parse_weights(None), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
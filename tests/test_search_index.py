@@ -0,0 +1,87 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from search_index import SearchIndex, index_tokens, snippet, tokenize_runs
+
+
+class TestTokenizer(unittest.TestCase):
+    def test_cjk_bigrams(self):
+        self.assertEqual(tokenize_runs("固態電池"), [["固態", "態電", "電池"]])
+
+    def test_single_cjk_character(self):
+        self.assertEqual(tokenize_runs("電"), [["電"]])
+
+    def test_mixed_text(self):
+        self.assertEqual(
+            tokenize_runs("Tesla的4680電池，產能2024年"),
+            [["tesla"], ["的"], ["4680"], ["電池"], ["產能"], ["2024"], ["年"]]
+        )
+
+    def test_punctuation_splits_runs(self):
+        self.assertEqual(index_tokens("電池、市場"), "電池 市場")
+
+    def test_snippet_marks_match(self):
+        self.assertEqual(snippet("全球電池市場規模", "電池", width=2), "...球**電池**市...")
+
+
+class TestBuildQuery(unittest.TestCase):
+    def test_sqlite(self):
+        index = SearchIndex("sqlite")
+        self.assertEqual(index.build_query("固態電池 Tesla"), '"固態 態電 電池" AND "tesla"')
+        self.assertEqual(index.build_query("電"), "電*")
+        self.assertIsNone(index.build_query("，。"))
+
+    def test_postgres(self):
+        index = SearchIndex("postgresql")
+        self.assertEqual(index.build_query("固態電池 Tesla"), "(固態 <-> 態電 <-> 電池) & (tesla)")
+        self.assertEqual(index.build_query("電"), "電:*")
+
+
+class TestSQLiteMatch(unittest.TestCase):
+    """以 SQLite FTS5 確認詞組比對：查詢的字必須相鄰出現。"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.index = SearchIndex("sqlite")
+        self.index.create(self.engine)
+        with self.engine.begin() as conn:
+            self.index.index(conn, "r1", "section", "技術", "固態電池的能量密度較高")
+            self.index.index(conn, "r1", "section", "市場", "電動車帶動電池需求，固態硬碟不在此列")
+
+    def match(self, query):
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT ref FROM search_documents WHERE search_documents MATCH :match ORDER BY ref"),
+                {"match": self.index.build_query(query)}
+            )
+            return [row.ref for row in rows]
+
+    def test_phrase(self):
+        self.assertEqual(self.match("固態電池"), ["技術"])
+        self.assertEqual(self.match("電池"), ["市場", "技術"])
+
+    def test_prefix(self):
+        self.assertEqual(self.match("硬"), ["市場"])
+
+    def test_reindex_replaces(self):
+        with self.engine.begin() as conn:
+            self.index.index(conn, "r1", "section", "技術", "鈉離子電池")
+        self.assertEqual(self.match("固態電池"), [])
+        self.assertEqual(self.match("鈉離子"), ["技術"])
+
+    def test_refs(self):
+        with self.engine.begin() as conn:
+            self.index.index(conn, "r1", "source", "https://example.com/a", "電池")
+            self.assertEqual(sorted(self.index.refs(conn, "r1", "section")), ["市場", "技術"])
+            self.assertEqual(self.index.refs(conn, "r1", "source"), ["https://example.com/a"])
+            self.assertEqual(self.index.refs(conn, "r2", "source"), [])
+
+    def test_remove(self):
+        with self.engine.begin() as conn:
+            self.index.remove(conn, "r1", "section")
+        self.assertEqual(self.match("電池"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
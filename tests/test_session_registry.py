@@ -0,0 +1,101 @@
+import time
+import unittest
+
+from session_registry import SessionRegistry, estimate_size
+
+
+class TestEstimateSize(unittest.TestCase):
+    def test_nested(self):
+        self.assertEqual(estimate_size("報告"), 6)
+        self.assertEqual(estimate_size({"a": ["bc", b"d"]}), 4)
+        self.assertEqual(estimate_size(3), 8)
+
+
+class TestSessionRegistry(unittest.TestCase):
+    def make_registry(self, **kwargs):
+        self.created = []
+
+        def factory(key):
+            self.created.append(key)
+            return {"key": key, "data": ""}
+
+        return SessionRegistry(factory, size_of=lambda value: len(value["data"]), **kwargs)
+
+    def test_factory_on_miss(self):
+        registry = self.make_registry()
+        first = registry.get("alice")
+        self.assertIs(registry.get("alice"), first)
+        self.assertEqual(self.created, ["alice"])
+        self.assertEqual(registry.stats()["hits"], 1)
+        self.assertEqual(registry.stats()["misses"], 1)
+
+    def test_evicts_least_recently_used(self):
+        registry = self.make_registry(max_entries=2)
+        registry.get("alice")
+        registry.get("bob")
+        registry.get("alice")
+        registry.get("carol")
+        self.assertIn("alice", registry)
+        self.assertNotIn("bob", registry)
+        self.assertEqual(registry.stats()["evictions"], 1)
+
+    def test_evicts_over_max_bytes_after_resize(self):
+        registry = self.make_registry(max_bytes=10)
+        registry.get("alice")["data"] = "x" * 6
+        registry.resize("alice")
+        registry.get("bob")["data"] = "y" * 6
+        registry.resize("bob")
+        self.assertNotIn("alice", registry)
+        self.assertIn("bob", registry)
+        self.assertEqual(registry.stats()["estimated_bytes"], 6)
+
+    def test_current_entry_kept_even_if_too_large(self):
+        registry = self.make_registry(max_bytes=10)
+        registry.get("alice")["data"] = "x" * 20
+        registry.resize("alice")
+        self.assertIn("alice", registry)
+
+    def test_get_does_not_resize(self):
+        registry = self.make_registry()
+        registry.get("alice")["data"] = "x" * 6
+        registry.get("alice")
+        self.assertEqual(registry.stats()["estimated_bytes"], 0)
+        registry.resize("alice")
+        self.assertEqual(registry.stats()["estimated_bytes"], 6)
+
+    def test_idle_entries_expire(self):
+        registry = self.make_registry(ttl_seconds=0.05)
+        registry.get("alice")
+        time.sleep(0.1)
+        registry.get("bob")
+        self.assertEqual(registry.evict_expired(), 1)
+        self.assertNotIn("alice", registry)
+        self.assertIn("bob", registry)
+
+    def test_sweep_on_get(self):
+        registry = self.make_registry(ttl_seconds=0.05, sweep_interval=0)
+        registry.get("alice")
+        time.sleep(0.1)
+        registry.get("bob")
+        self.assertEqual(len(registry), 1)
+
+    def test_pop_prefix(self):
+        registry = self.make_registry()
+        for key in ("alice/r1", "alice/r2", "alicia/r3"):
+            registry.get(key)["data"] = "xx"
+            registry.resize(key)
+        removed = registry.pop_prefix("alice/")
+        self.assertEqual(sorted(value["key"] for value in removed), ["alice/r1", "alice/r2"])
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.stats()["estimated_bytes"], 2)
+
+    def test_put_replaces(self):
+        registry = self.make_registry()
+        registry.get("alice")
+        registry.put("alice", {"key": "alice", "data": "new"})
+        self.assertEqual(registry.get("alice")["data"], "new")
+        self.assertEqual(registry.stats()["estimated_bytes"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import time
+import unittest
+
+from session_store import InMemorySessionStore, SQLSessionStore, SessionStore, StaleSessionError, merge_states
+
+
+class TestMergeStates(unittest.TestCase):
+    def test_keeps_remote_changes_to_other_keys(self):
+        base = {"links": ["a"], "final_result": {"前言": "舊", "結論": "舊"}}
+        local = {"links": ["a"], "final_result": {"前言": "新", "結論": "舊"}}
+        remote = {"links": ["a", "b"], "final_result": {"前言": "舊", "結論": "其他"}}
+        self.assertEqual(merge_states(base, local, remote), {
+            "links": ["a", "b"],
+            "final_result": {"前言": "新", "結論": "其他"}
+        })
+
+    def test_local_wins_on_same_key(self):
+        self.assertEqual(merge_states({"a": 1}, {"a": 2}, {"a": 3}), {"a": 2})
+
+    def test_additions_and_removals(self):
+        base = {"a": 1, "b": 2}
+        local = {"a": 1, "c": 3}
+        remote = {"a": 1, "b": 2, "d": 4}
+        self.assertEqual(merge_states(base, local, remote), {"a": 1, "c": 3, "d": 4})
+
+
+class SessionStoreTests:
+    def make_store(self, ttl_seconds: float = 0):
+        raise NotImplementedError
+
+    def test_versions(self):
+        store = self.make_store()
+        self.assertIsNone(store.load("alice/r1"))
+        self.assertEqual(store.save("alice/r1", {"a": 1}), 1)
+        self.assertEqual(store.save("alice/r1", {"a": 2}, expected_version=1), 2)
+        self.assertEqual(store.load("alice/r1"), (2, {"a": 2}))
+        self.assertEqual(store.get_version("alice/r1"), 2)
+
+    def test_stale_save_rejected(self):
+        store = self.make_store()
+        store.save("alice/r1", {"a": 1})
+        store.save("alice/r1", {"a": 2})
+        with self.assertRaises(StaleSessionError):
+            store.save("alice/r1", {"a": 3}, expected_version=1)
+        self.assertEqual(store.load("alice/r1"), (2, {"a": 2}))
+
+    def test_delete_prefix(self):
+        store = self.make_store()
+        for key in ("alice/r1", "alice/r2", "alicia/r3"):
+            store.save(key, {})
+        store.delete_prefix("alice/")
+        self.assertIsNone(store.load("alice/r1"))
+        self.assertIsNone(store.load("alice/r2"))
+        self.assertIsNotNone(store.load("alicia/r3"))
+
+    def test_prune(self):
+        store = self.make_store()
+        store.save("alice/r1", {})
+        time.sleep(0.05)
+        store.save("bob/r2", {})
+        self.assertEqual(store.prune(0.03), 1)
+        self.assertIsNone(store.load("alice/r1"))
+        self.assertIsNotNone(store.load("bob/r2"))
+
+    def test_prune_on_save_when_ttl_set(self):
+        store = self.make_store(ttl_seconds=0.03)
+        store.prune_interval = 0
+        store.save("alice/r1", {})
+        time.sleep(0.05)
+        store.save("bob/r2", {})
+        self.assertIsNone(store.load("alice/r1"))
+
+
+class TestSessionStoreInterface(unittest.TestCase):
+    def test_incomplete_store_cannot_be_created(self):
+        class PartialStore(SessionStore):
+            def load(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            PartialStore()
+        with self.assertRaises(TypeError):
+            SessionStore()
+
+
+class TestInMemorySessionStore(SessionStoreTests, unittest.TestCase):
+    def make_store(self, ttl_seconds: float = 0):
+        return InMemorySessionStore(ttl_seconds=ttl_seconds)
+
+
+class TestSQLSessionStore(SessionStoreTests, unittest.TestCase):
+    def make_store(self, ttl_seconds: float = 0):
+        return SQLSessionStore("sqlite://", ttl_seconds=ttl_seconds)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import threading
+import time
+import unittest
+
+from metrics import MetricsRegistry
+from scheduling import BATCH, INTERACTIVE, work_context
+from work_pool import WorkPool
+
+
+class Tracker:
+    """記錄同時執行的工作數，工作在 release 前保持執行。"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self.running = {}
+        self.peak = {}
+        self.order = []
+
+    def task(self, owner: str, name: str = ""):
+        with self.lock:
+            self.running[owner] = self.running.get(owner, 0) + 1
+            self.peak[owner] = max(self.peak.get(owner, 0), self.running[owner])
+            self.order.append(name or owner)
+        self.release.wait(5)
+        with self.lock:
+            self.running[owner] -= 1
+
+
+def wait_until(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestWorkPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkPool("test", max_workers=4, request_quota=2, user_quota=3, metrics=MetricsRegistry())
+        self.tracker = Tracker()
+
+    def tearDown(self):
+        self.tracker.release.set()
+        self.pool.shutdown()
+
+    def test_request_quota(self):
+        with self.pool.group("alice") as group:
+            futures = [group.submit(self.tracker.task, "request") for _ in range(5)]
+            self.assertTrue(wait_until(lambda: self.pool.stats()["running"] == 2))
+            time.sleep(0.05)
+            self.assertEqual(self.pool.stats()["running"], 2)
+            self.assertEqual(self.pool.stats()["queued"], 3)
+            self.tracker.release.set()
+            for future in futures:
+                future.result(timeout=5)
+        self.assertEqual(self.tracker.peak["request"], 2)
+
+    def test_user_quota_leaves_room_for_other_users(self):
+        alice_first, alice_second, bob = self.pool.group("alice"), self.pool.group("alice"), self.pool.group("bob")
+        with alice_first, alice_second, bob:
+            futures = [alice_first.submit(self.tracker.task, "alice") for _ in range(3)]
+            futures += [alice_second.submit(self.tracker.task, "alice") for _ in range(3)]
+            self.assertTrue(wait_until(lambda: self.tracker.running.get("alice") == 3))
+            futures.append(bob.submit(self.tracker.task, "bob"))
+            self.assertTrue(wait_until(lambda: self.tracker.running.get("bob") == 1))
+            self.tracker.release.set()
+            for future in futures:
+                future.result(timeout=5)
+        self.assertEqual(self.tracker.peak["alice"], 3)
+
+    def test_interactive_groups_first(self):
+        pool = WorkPool("single", max_workers=1, request_quota=1, user_quota=1)
+        try:
+            blocker = threading.Event()
+            with pool.group("carol") as busy:
+                busy.submit(blocker.wait, 5)
+                with work_context("alice", BATCH):
+                    batch = pool.group("alice")
+                with work_context("bob", INTERACTIVE):
+                    interactive = pool.group("bob")
+                with batch, interactive:
+                    futures = [batch.submit(self.tracker.order.append, "batch")]
+                    futures.append(interactive.submit(self.tracker.order.append, "interactive"))
+                    blocker.set()
+                    for future in futures:
+                        future.result(timeout=5)
+        finally:
+            pool.shutdown()
+        self.assertEqual(self.tracker.order, ["interactive", "batch"])
+
+    def test_pending_cancelled_on_exit(self):
+        with self.pool.group("alice") as group:
+            futures = [group.submit(self.tracker.task, "alice") for _ in range(4)]
+            self.assertTrue(wait_until(lambda: self.pool.stats()["running"] == 2))
+        self.assertEqual(sum(future.cancelled() for future in futures), 2)
+        self.assertEqual(self.pool.stats()["queued"], 0)
+
+    def test_exceptions_propagate(self):
+        def fail():
+            raise ValueError("boom")
+
+        with self.pool.group("alice") as group:
+            with self.assertRaises(ValueError):
+                group.submit(fail).result(timeout=5)
+        self.assertTrue(wait_until(lambda: self.pool.stats()["running"] == 0))
+
+
+if __name__ == "__main__":
+    unittest.main()